@@ -0,0 +1,415 @@
+import math
+from bisect import bisect_right
+from textwrap import wrap
+
+from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch
+from matplotlib.ticker import FuncFormatter
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+
+def format_money(x, p=None):
+    if x >= 1e6:
+        return f'${x/1e6:.1f}M'
+    elif x >= 1e3:
+        return f'${x/1e3:.1f}K'
+    return f'${x:.0f}'
+
+
+def format_thousands(x, p=None):
+    return f'${x/1000:.1f}K' if x >= 1000 else f'${x:.0f}'
+
+
+class SpanIndex:
+    """Artists as sorted [start, end] spans along one axis, looked up with bisect."""
+
+    def __init__(self, spans):
+        spans = sorted(spans)
+        self.starts = [start for start, _, _ in spans]
+        self.ends = [end for _, end, _ in spans]
+        self.items = [item for _, _, item in spans]
+
+    def find(self, value):
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.items[i]
+        return None
+
+
+class HoverTooltip:
+    """Hover highlight and tooltip shared by every chart, drawn with blitting.
+
+    After each full draw the figure is cached as a background. On hover only
+    an outline of the hovered artist and the tooltip box are drawn over that
+    background and blitted, so moving the mouse never re-renders the figure.
+    Motion events are coalesced to one hit test per display frame, and
+    nothing is drawn while the pointer stays on the same artist.
+    """
+
+    frame_ms = 16
+
+    def __init__(self, chart):
+        self.chart = chart
+        self.background = None
+        self.hovered = None
+        self.highlight = None
+        self.text = None
+        self._position = (False, None, None)
+        self._scheduled = False
+        chart.canvas.mpl_connect('draw_event', self.on_draw)
+        chart.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        chart.canvas.mpl_connect('axes_leave_event', self.on_leave)
+
+    def reset(self):
+        # Artists were rebuilt or moved: drop the highlight and make sure the tooltip text still exists
+        ax = self.chart.ax
+        self.hovered = None
+        self.highlight = None
+        if self.text is None or self.text not in ax.texts:
+            self.text = ax.text(0.5, 0.95, '', transform=ax.transAxes,
+                                ha='center', va='top', fontsize=10, animated=True,
+                                bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.7))
+        self.text.set_visible(False)
+
+    def on_draw(self, event):
+        # Animated artists are skipped by full draws, so this is the clean figure
+        self.background = self.chart.canvas.copy_from_bbox(self.chart.figure.bbox)
+        if self.hovered is not None:
+            self._blit()
+
+    def on_motion(self, event):
+        self._position = (event.inaxes is self.chart.ax, event.xdata, event.ydata)
+        self._schedule()
+
+    def on_leave(self, event):
+        self._position = (False, None, None)
+        self._schedule()
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            self.chart.canvas.get_tk_widget().after(self.frame_ms, self._flush)
+
+    def _flush(self):
+        self._scheduled = False
+        inside, x, y = self._position
+        hovered = self.chart.hit_test(x, y) if inside and self.chart.artists else None
+        if hovered == self.hovered:
+            return
+        self.hovered = hovered
+
+        self.highlight = None
+        if hovered is not None:
+            artist = self.chart.artists[hovered]
+            self.highlight = PathPatch(artist.get_path(), transform=artist.get_transform(),
+                                       fill=False, edgecolor='black', linewidth=2, animated=True)
+            self.highlight.set_figure(self.chart.figure)
+            self.text.set_text(self.chart.tooltips[hovered])
+        self.text.set_visible(hovered is not None)
+        self._blit()
+
+    def _blit(self):
+        if self.background is None:
+            return
+        canvas, ax = self.chart.canvas, self.chart.ax
+        canvas.restore_region(self.background)
+        if self.highlight is not None:
+            ax.draw_artist(self.highlight)
+        if self.text.get_visible():
+            ax.draw_artist(self.text)
+        canvas.blit(self.chart.figure.bbox)
+
+
+class Chart:
+    """A chart card's Figure, Axes and Tk canvas, kept for as long as the card exists.
+
+    update() moves the existing artists (bar heights, wedge angles, histogram
+    bins) when the data has the same shape as before, and only rebuilds the
+    axes content when it does not. Either way the canvas is redrawn once with
+    draw_idle, and no Figure or canvas is created after the first update.
+    Hovering is handled by a HoverTooltip over a SpanIndex of the artists.
+    """
+
+    empty_message = 'No data available'
+
+    def __init__(self, parent, colors, text_color, figsize):
+        self.colors = colors
+        self.text_color = text_color
+        # Plain Figure rather than pyplot, so nothing accumulates in pyplot's figure manager
+        self.figure = Figure(figsize=figsize, dpi=100)
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.artists = []
+        self.tooltips = []
+        self.index = SpanIndex([])
+        self.tooltip = HoverTooltip(self)
+
+    def update(self, data):
+        if not (self.artists and self.update_in_place(data)):
+            self.ax.clear()
+            self.artists = []
+            if data:
+                self.build(data)
+            else:
+                self.ax.text(0.5, 0.5, self.empty_message, ha='center', va='center',
+                             fontsize=12, color='gray', transform=self.ax.transAxes)
+            self.figure.tight_layout()
+        self.index = SpanIndex(self.spans())
+        self.tooltip.reset()
+        self.canvas.draw_idle()
+
+    def build(self, data):
+        raise NotImplementedError
+
+    def update_in_place(self, data):
+        """Update the existing artists, or return False when they have to be rebuilt."""
+        return False
+
+    def rescale(self):
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def spans(self):
+        # Vertical bars and histogram bins: indexed by their extent along x
+        return [(bar.get_x(), bar.get_x() + bar.get_width(), i) for i, bar in enumerate(self.artists)]
+
+    def hit_test(self, x, y):
+        """Index of the artist under the data coordinates (x, y), or None."""
+        i = self.index.find(x)
+        if i is None:
+            return None
+        height = self.artists[i].get_height()
+        return i if min(0, height) <= y <= max(0, height) else None
+
+
+class BarChart(Chart):
+    """Vertical bars with their value written on top, one bar per (label, value) row."""
+
+    def __init__(self, parent, colors, text_color, figsize, xlabel, ylabel,
+                 value_format, tooltip_format, axis_format=None):
+        super().__init__(parent, colors, text_color, figsize)
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.value_format = value_format
+        self.tooltip_format = tooltip_format
+        self.axis_format = axis_format
+        self.value_texts = []
+
+    @staticmethod
+    def _split(data):
+        return [x[0] for x in data], [x[1] if x[1] is not None else 0 for x in data]
+
+    def build(self, data):
+        labels, values = self._split(data)
+        positions = range(len(labels))
+        self.artists = list(self.ax.bar(positions, values, color=self.colors[:len(labels)]))
+        self.ax.set_xticks(positions)
+        self.ax.set_xticklabels(labels, rotation=30, ha='right')
+        self.ax.set_xlabel(self.xlabel, fontsize=10, labelpad=10)
+        self.ax.set_ylabel(self.ylabel, fontsize=10, labelpad=10)
+        if self.axis_format:
+            self.ax.yaxis.set_major_formatter(FuncFormatter(self.axis_format))
+
+        self.value_texts = [
+            self.ax.text(bar.get_x() + bar.get_width() / 2., value, self.value_format(value),
+                         ha='center', va='bottom', fontsize=8, fontweight='bold')
+            for bar, value in zip(self.artists, values)
+        ]
+        self.tooltips = [self.tooltip_format(label, value) for label, value in zip(labels, values)]
+
+    def update_in_place(self, data):
+        labels, values = self._split(data)
+        if len(labels) != len(self.artists):
+            return False
+        for bar, text, value in zip(self.artists, self.value_texts, values):
+            bar.set_height(value)
+            text.set_y(value)
+            text.set_text(self.value_format(value))
+        self.ax.set_xticklabels(labels, rotation=30, ha='right')
+        self.tooltips = [self.tooltip_format(label, value) for label, value in zip(labels, values)]
+        self.rescale()
+        return True
+
+
+class HorizontalBarChart(Chart):
+    """Horizontal bars labelled by name, e.g. top products or low stock items."""
+
+    def __init__(self, parent, colors, text_color, figsize, xlabel,
+                 value_format, tooltip_format, axis_format=None, single_color=False,
+                 empty_message=None):
+        super().__init__(parent, colors, text_color, figsize)
+        self.xlabel = xlabel
+        self.value_format = value_format
+        self.tooltip_format = tooltip_format
+        self.axis_format = axis_format
+        self.single_color = single_color
+        if empty_message:
+            self.empty_message = empty_message
+        self.value_texts = []
+
+    def build(self, data):
+        names = [x[0] for x in data]
+        values = [x[1] or 0 for x in data]
+        positions = range(len(names))
+        colors = self.colors[0] if self.single_color else self.colors[:len(names)]
+        self.artists = list(self.ax.barh(positions, values, color=colors))
+        self.ax.set_yticks(positions)
+        self.ax.set_yticklabels(names, fontsize=8)
+        self.ax.set_ylim(-0.5, len(names) - 0.5)
+        self.ax.set_xlabel(self.xlabel, fontsize=10, labelpad=10)
+        if self.axis_format:
+            self.ax.xaxis.set_major_formatter(FuncFormatter(self.axis_format))
+
+        self.value_texts = [
+            self.ax.text(value, i, self.value_format(value),
+                         ha='left', va='center', fontsize=8, fontweight='bold')
+            for i, value in enumerate(values)
+        ]
+        self.tooltips = [self.tooltip_format(name, value) for name, value in zip(names, values)]
+
+    def update_in_place(self, data):
+        if len(data) != len(self.artists):
+            return False
+        names = [x[0] for x in data]
+        values = [x[1] or 0 for x in data]
+        for bar, text, value in zip(self.artists, self.value_texts, values):
+            bar.set_width(value)
+            text.set_x(value)
+            text.set_text(self.value_format(value))
+        self.ax.set_yticklabels(names, fontsize=8)
+        self.tooltips = [self.tooltip_format(name, value) for name, value in zip(names, values)]
+        self.rescale()
+        return True
+
+    def spans(self):
+        return [(bar.get_y(), bar.get_y() + bar.get_height(), i) for i, bar in enumerate(self.artists)]
+
+    def hit_test(self, x, y):
+        i = self.index.find(y)
+        if i is None:
+            return None
+        width = self.artists[i].get_width()
+        return i if min(0, width) <= x <= max(0, width) else None
+
+
+class PieChart(Chart):
+    """Donut chart of (label, count) rows; wedges are re-angled in place when categories stay the same."""
+
+    radius = 0.8
+    width = 0.6
+    pctdistance = 0.85
+    labeldistance = 1.2
+
+    def __init__(self, parent, colors, text_color, figsize, tooltip_format):
+        super().__init__(parent, colors, text_color, figsize)
+        self.tooltip_format = tooltip_format
+        self.labels = []
+        self.texts = []
+        self.autotexts = []
+
+    def build(self, data):
+        self.labels = [x[0] for x in data]
+        counts = [x[1] for x in data]
+
+        # Center the pie chart and give more space for labels
+        self.ax.set_position([0.1, 0.1, 0.8, 0.8])
+
+        wedges, self.texts, self.autotexts = self.ax.pie(
+            counts,
+            labels=['\n'.join(wrap(label, 15)) for label in self.labels],
+            autopct='%1.0f%%',
+            colors=self.colors[:len(self.labels)],
+            wedgeprops={'width': self.width},
+            textprops={'fontsize': 8, 'ha': 'center', 'va': 'center'},
+            pctdistance=self.pctdistance,
+            radius=self.radius,
+            labeldistance=self.labeldistance
+        )
+        for text in self.autotexts:
+            text.set(size=8, weight="bold", color="white")
+        for text in self.texts:
+            text.set(size=8, color=self.text_color)
+        self.artists = list(wedges)
+        self.tooltips = [self.tooltip_format(label, count) for label, count in zip(self.labels, counts)]
+
+    def update_in_place(self, data):
+        labels = [x[0] for x in data]
+        counts = [x[1] for x in data]
+        total = sum(counts)
+        if labels != self.labels or not total:
+            return False
+
+        # Same layout as Axes.pie: counterclockwise from 0 degrees
+        theta1 = 0.0
+        for wedge, text, autotext, count in zip(self.artists, self.texts, self.autotexts, counts):
+            frac = count / total
+            theta2 = theta1 + frac
+            wedge.set_theta1(360 * theta1)
+            wedge.set_theta2(360 * theta2)
+            middle = math.pi * (theta1 + theta2)
+            cos, sin = math.cos(middle), math.sin(middle)
+            text.set_position((self.labeldistance * self.radius * cos, self.labeldistance * self.radius * sin))
+            autotext.set_position((self.pctdistance * self.radius * cos, self.pctdistance * self.radius * sin))
+            autotext.set_text(f'{frac * 100:1.0f}%')
+            theta1 = theta2
+        self.tooltips = [self.tooltip_format(label, count) for label, count in zip(labels, counts)]
+        return True
+
+    def spans(self):
+        # Wedges are indexed by angle, the ring is checked by distance from the center
+        return [(wedge.theta1, wedge.theta2, i) for i, wedge in enumerate(self.artists)]
+
+    def hit_test(self, x, y):
+        distance = math.hypot(x, y)
+        if not self.radius - self.width <= distance <= self.radius:
+            return None
+        return self.index.find(math.degrees(math.atan2(y, x)) % 360)
+
+
+class HistogramChart(Chart):
+    """Histogram of a dashboard.Histogram whose bins were counted by the database."""
+
+    def __init__(self, parent, colors, text_color, figsize, xlabel, ylabel, tooltip_label,
+                 money_axis=False):
+        super().__init__(parent, colors, text_color, figsize)
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.tooltip_label = tooltip_label
+        self.money_axis = money_axis
+
+    def _tooltips(self, histogram):
+        edges, counts = histogram.edges, histogram.counts
+        prefix = '$' if self.money_axis else ''
+        return [f"{self.tooltip_label}: {prefix}{edges[i]:.0f} - {prefix}{edges[i + 1]:.0f}, Count: {int(counts[i])}"
+                for i in range(len(counts))]
+
+    def _format_axis(self, histogram):
+        if self.money_axis and histogram.edges[-1] > 1000:
+            self.ax.xaxis.set_major_formatter(FuncFormatter(format_thousands))
+
+    def build(self, histogram):
+        # Each bin is drawn from its left edge, weighted by its count
+        _, _, patches = self.ax.hist(histogram.edges[:-1], bins=histogram.edges,
+                                     weights=histogram.counts, edgecolor='white')
+        for i, patch in enumerate(patches):
+            patch.set_facecolor(self.colors[i % len(self.colors)])
+        self.ax.set_xlabel(self.xlabel, fontsize=10, labelpad=10)
+        self.ax.set_ylabel(self.ylabel, fontsize=10, labelpad=10)
+        self._format_axis(histogram)
+        self.artists = list(patches)
+        self.tooltips = self._tooltips(histogram)
+
+    def update_in_place(self, histogram):
+        if len(histogram.counts) != len(self.artists):
+            return False
+        edges = histogram.edges
+        for i, (patch, count) in enumerate(zip(self.artists, histogram.counts)):
+            patch.set_x(edges[i])
+            patch.set_width(edges[i + 1] - edges[i])
+            patch.set_height(count)
+        self._format_axis(histogram)
+        self.tooltips = self._tooltips(histogram)
+        self.rescale()
+        return True
@@ -0,0 +1,311 @@
+from migrations import LOW_STOCK_THRESHOLD
+
+
+TOP_PRODUCTS = 5
+# Ranked products kept beyond the ones shown, so edits and deletes can be absorbed without a reload
+TOP_BUFFER = TOP_PRODUCTS * 4
+
+# Histogram bin counts per metric, capped by the number of distinct values like the charts always did
+HISTOGRAM_BINS = {"price": 8, "quantity": 10, "value": 8}
+
+# All dashboard statements, sent in a single round trip and read inside one snapshot.
+# Totals and per-category aggregates come from category_stats, kept up to date by triggers.
+SNAPSHOT_SQL = f"""
+    SELECT SUM(product_count), SUM(stock_value), SUM(low_stock_count),
+           (SELECT COUNT(*) FROM category)
+    FROM category_stats;
+
+    SELECT c.name, COALESCE(s.product_count, 0), COALESCE(s.stock_value, 0),
+           COALESCE(s.price_sum, 0), COALESCE(s.price_count, 0)
+    FROM category c
+    LEFT JOIN category_stats s ON s.category_id = c.id
+    ORDER BY c.id;
+
+    SELECT v.metric, s.lo, s.hi, s.bins, s.distinct_values,
+           LEAST(COALESCE(FLOOR((v.value - s.lo) / NULLIF(s.hi - s.lo, 0) * s.bins), 0), s.bins - 1) AS bin,
+           COUNT(*)
+    FROM (
+        SELECT 'price' AS metric, price AS value FROM product
+        UNION ALL SELECT 'quantity', quantity FROM product
+        UNION ALL SELECT 'value', stock_value FROM product
+    ) v
+    JOIN (
+        SELECT 'price' AS metric, MIN(price) AS lo, MAX(price) AS hi,
+               LEAST({HISTOGRAM_BINS['price']}, COUNT(DISTINCT price)) AS bins,
+               COUNT(DISTINCT price) AS distinct_values
+        FROM product
+        UNION ALL
+        SELECT 'quantity', MIN(quantity), MAX(quantity),
+               LEAST({HISTOGRAM_BINS['quantity']}, COUNT(DISTINCT quantity)), COUNT(DISTINCT quantity)
+        FROM product
+        UNION ALL
+        SELECT 'value', MIN(stock_value), MAX(stock_value),
+               LEAST({HISTOGRAM_BINS['value']}, COUNT(DISTINCT stock_value)), COUNT(DISTINCT stock_value)
+        FROM product
+    ) s ON s.metric = v.metric
+    WHERE v.value IS NOT NULL
+    GROUP BY v.metric, s.lo, s.hi, s.bins, s.distinct_values, bin;
+
+    (SELECT 'top', id, name, stock_value
+     FROM product
+     ORDER BY stock_value DESC
+     LIMIT {TOP_BUFFER})
+    UNION ALL
+    (SELECT 'low', id, name, quantity
+     FROM product
+     WHERE quantity < {LOW_STOCK_THRESHOLD});
+
+    SELECT COALESCE(MAX(id), 0) FROM change_log;
+"""
+
+
+class Histogram:
+    """Pre-binned histogram: len(edges) == len(counts) + 1, equal-width bins like numpy's."""
+
+    def __init__(self, edges=None, counts=None, distinct=0):
+        self.edges = edges or []
+        self.counts = counts or []
+        # Lower bound on the number of distinct values, which decides the bin count
+        self.distinct = distinct
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    @classmethod
+    def from_bins(cls, lo, hi, bins, counts_by_bin, distinct=0):
+        lo, hi = float(lo), float(hi)
+        if lo == hi:
+            # Same widening numpy applies to a single distinct value
+            lo, hi = lo - 0.5, hi + 0.5
+        width = (hi - lo) / bins
+        edges = [lo + width * i for i in range(bins)] + [hi]
+        counts = [counts_by_bin.get(i, 0) for i in range(bins)]
+        return cls(edges, counts, distinct)
+
+
+def stock_value(row):
+    price, quantity = row[3], row[4]
+    if price is None or quantity is None:
+        return None
+    return price * quantity
+
+
+class ProductChange:
+    """One product write, as the rows (id, name, description, price, quantity, category) before and after.
+
+    old is None for an insert and new is None for a delete. unknown holds
+    the indexes of old columns whose value was not recorded (None in old).
+    """
+
+    def __init__(self, old, new, unknown=()):
+        self.old = tuple(old) if old is not None else None
+        self.new = tuple(new) if new is not None else None
+        self.unknown = frozenset(unknown)
+
+    @property
+    def product_id(self):
+        return (self.new or self.old)[0]
+
+    @property
+    def count_changed(self):
+        return self.old is None or self.new is None
+
+    def __repr__(self):
+        return f"ProductChange(old={self.old!r}, new={self.new!r})"
+
+
+class DashboardSnapshot:
+    """Everything the KPI cards, header and charts display, read at one point in time.
+
+    apply() folds a ProductChange into the aggregates, so single-row edits
+    update the dashboard without querying the database again.
+    """
+
+    def __init__(self):
+        self.total_products = 0
+        self.total_value = 0
+        self.low_stock_count = 0
+        self.category_count = 0
+        # name -> [product count, stock value, sum of prices, number of prices]
+        self.category_totals = {}
+        self.histograms = {}
+        # Best products by stock value as (id, name, value), best first
+        self.top_ranking = []
+        # True when top_ranking holds every product, so nothing can be missing below it
+        self.top_complete = False
+        # (id, name, quantity) of every product under LOW_STOCK_THRESHOLD
+        self.low_stock_rows = []
+        # Last change_log entry included in this snapshot
+        self.change_version = 0
+
+    @property
+    def categories(self):
+        # (name, product count, stock value, average price)
+        return [(name, count, value, price_sum / prices if prices else None)
+                for name, (count, value, price_sum, prices) in self.category_totals.items()]
+
+    @property
+    def product_distribution(self):
+        return [(name, count) for name, count, _, _ in self.categories]
+
+    @property
+    def stock_value(self):
+        return [(name, value) for name, _, value, _ in self.categories]
+
+    @property
+    def category_distribution(self):
+        return sorted(self.product_distribution, key=lambda row: row[1], reverse=True)
+
+    @property
+    def avg_price(self):
+        # NULL averages (empty categories) last, as MySQL sorts them in DESC order
+        rows = [(name, avg) for name, _, _, avg in self.categories]
+        return sorted(rows, key=lambda row: (row[1] is not None, row[1] or 0), reverse=True)
+
+    @property
+    def top_products(self):
+        return [(name, value) for _, name, value in self.top_ranking[:TOP_PRODUCTS]]
+
+    @property
+    def low_stock(self):
+        return [(name, quantity) for _, name, quantity in self.low_stock_rows]
+
+    def histogram(self, metric):
+        return self.histograms.get(metric, Histogram())
+
+    def apply(self, change):
+        """Update the aggregates from one product change.
+
+        Returns False when the change cannot be folded in exactly (unknown
+        category, a histogram whose bins would move, or too few ranked
+        products left); the snapshot must then be reloaded and not rendered.
+        """
+        for row, sign in ((change.old, -1), (change.new, 1)):
+            if row is None:
+                continue
+            price, category = row[3], row[5]
+            value = stock_value(row)
+            totals = self.category_totals.get(category)
+            if totals is None:
+                return False
+
+            self.total_products += sign
+            self.total_value += sign * (value or 0)
+
+            totals[0] += sign
+            totals[1] += sign * (value or 0)
+            if price is not None:
+                totals[2] += sign * price
+                totals[3] += sign
+
+        for metric, amount_of in (('price', lambda row: row[3]), ('quantity', lambda row: row[4]),
+                                  ('value', stock_value)):
+            old = amount_of(change.old) if change.old is not None else None
+            new = amount_of(change.new) if change.new is not None else None
+            if change.old is not None and change.new is not None and old == new:
+                # Same bin, and no distinct value can be lost
+                continue
+            for amount, sign in ((old, -1), (new, 1)):
+                if amount is not None and not self._rebin(metric, amount, sign):
+                    return False
+
+        self._update_low_stock(change)
+        return self._rerank(change)
+
+    def _rebin(self, metric, amount, sign):
+        histogram = self.histograms.get(metric)
+        if not histogram or len(histogram.counts) < HISTOGRAM_BINS[metric]:
+            # Fewer bins than the cap means few distinct values: one more or less changes the bins
+            return False
+        lo, hi = histogram.edges[0], histogram.edges[-1]
+        if not lo < amount < hi:
+            # Outside the range, or the current minimum/maximum leaving: the edges would move
+            return False
+        if sign < 0:
+            # The row may have been the last one with its value: once the distinct values
+            # could fall under the cap, the database would count fewer bins
+            if histogram.distinct - 1 < HISTOGRAM_BINS[metric]:
+                return False
+            histogram.distinct -= 1
+        bins = len(histogram.counts)
+        index = min(int((amount - lo) / (hi - lo) * bins), bins - 1)
+        histogram.counts[index] += sign
+        return True
+
+    def _update_low_stock(self, change):
+        rows = [row for row in self.low_stock_rows if row[0] != change.product_id]
+        new = change.new
+        if new is not None and new[4] is not None and new[4] < LOW_STOCK_THRESHOLD:
+            rows.append((new[0], new[1], new[4]))
+            rows.sort(key=lambda row: row[2])
+        self.low_stock_rows = rows
+        self.low_stock_count = len(rows)
+
+    def _rerank(self, change):
+        # Products outside the ranking are all worth at most its last value
+        floor = self.top_ranking[-1][2] if self.top_ranking else None
+        ranking = [entry for entry in self.top_ranking if entry[0] != change.product_id]
+
+        new = change.new
+        if new is not None:
+            value = stock_value(new)
+            if self.top_complete or (value is not None and floor is not None and value >= floor):
+                ranking.append((new[0], new[1], value))
+                ranking.sort(key=lambda entry: (entry[2] is not None, entry[2] or 0), reverse=True)
+
+        if len(ranking) > TOP_BUFFER:
+            ranking = ranking[:TOP_BUFFER]
+            self.top_complete = False
+        self.top_ranking = ranking
+        return self.top_complete or len(ranking) >= TOP_PRODUCTS
+
+
+def load_snapshot(db):
+    """Read the dashboard in a consistent snapshot with a single multi-statement round trip."""
+    snapshot = DashboardSnapshot()
+    with db.connection() as conn:
+        conn.start_transaction(consistent_snapshot=True, isolation_level="REPEATABLE READ", readonly=True)
+        cursor = conn.cursor()
+        try:
+            results = [result.fetchall() for result in cursor.execute(SNAPSHOT_SQL, multi=True)
+                       if result.with_rows]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    kpis, categories, bins, ranked, version = results
+
+    total_products, total_value, low_stock_count, category_count = kpis[0]
+    snapshot.total_products = int(total_products or 0)
+    snapshot.total_value = int(total_value or 0)
+    snapshot.low_stock_count = int(low_stock_count or 0)
+    snapshot.category_count = category_count
+
+    snapshot.category_totals = {
+        name: [count, int(value or 0), int(price_sum or 0), prices]
+        for name, count, value, price_sum, prices in categories
+    }
+
+    grouped = {}
+    for metric, lo, hi, bin_count, distinct, index, count in bins:
+        grouped.setdefault(metric, (lo, hi, bin_count, distinct, {}))[4][int(index)] = count
+    snapshot.histograms = {
+        metric: Histogram.from_bins(lo, hi, bin_count, counts, distinct)
+        for metric, (lo, hi, bin_count, distinct, counts) in grouped.items()
+    }
+
+    # A UNION ALL keeps no order, neither across nor inside its branches: sort here
+    snapshot.top_ranking = sorted(
+        ((product_id, name, int(amount) if amount is not None else None)
+         for kind, product_id, name, amount in ranked if kind == 'top'),
+        key=lambda entry: (entry[2] is not None, entry[2] or 0), reverse=True)
+    snapshot.top_complete = len(snapshot.top_ranking) < TOP_BUFFER
+    snapshot.low_stock_rows = sorted(
+        ((product_id, name, int(amount))
+         for kind, product_id, name, amount in ranked if kind == 'low'),
+        key=lambda row: row[2])
+    snapshot.change_version = version[0][0]
+    return snapshot
@@ -0,0 +1,300 @@
+import re
+import time
+import threading
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling, errors
+
+
+class DatabasePool:
+    """Pooled access to the Store database with short-lived cursors.
+
+    Every caller borrows a connection for the duration of a `with` block and
+    hands it back to the pool afterwards, so cursors never outlive the work
+    they were opened for and concurrent callers do not share one socket.
+    """
+
+    def __init__(self, host, user, password, database, pool_name="stock_manager",
+                 pool_size=5, checkout_timeout=10.0, max_retries=5, base_delay=0.2, client_id=None):
+        self.config = {
+            "host": host,
+            "user": user,
+            "password": password,
+            "database": database,
+        }
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        # Written into change_log by the triggers, so a client can skip its own changes
+        self.client_id = client_id
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "held_total": 0.0,
+            "held_max": 0.0,
+            "reconnects": 0,
+            "failed_checkouts": 0,
+        }
+
+        self._pool = None
+        self._create_pool()
+
+        # Dedicated connection for KILL QUERY, so aborting works even when the pool is busy
+        self._side_conn = None
+        self._side_lock = threading.Lock()
+
+    @staticmethod
+    def bootstrap(host, user, password, database):
+        # The pool needs an existing schema, so create it with a one-off connection
+        conn = mysql.connector.connect(host=host, user=user, password=password)
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+    def _create_pool(self):
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name=self.pool_name,
+            pool_size=self.pool_size,
+            pool_reset_session=True,
+            **self.config
+        )
+
+    def _backoff(self, attempt):
+        # Exponential backoff capped at two seconds between attempts
+        time.sleep(min(self.base_delay * (2 ** attempt), 2.0))
+
+    def _checkout(self):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                conn = self._pool.get_connection()
+                break
+            except errors.PoolError:
+                # Pool exhausted: wait for another caller to return a connection
+                if time.perf_counter() - start > self.checkout_timeout:
+                    with self._stats_lock:
+                        self._stats["failed_checkouts"] += 1
+                    raise
+                time.sleep(0.01)
+            except (errors.InterfaceError, errors.OperationalError):
+                # Server unreachable: retry with backoff, then give up
+                if attempt >= self.max_retries:
+                    with self._stats_lock:
+                        self._stats["failed_checkouts"] += 1
+                    raise
+                self._backoff(attempt)
+                attempt += 1
+
+        self._ensure_healthy(conn)
+
+        wait = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_total"] += wait
+            self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+        return conn
+
+    def _ensure_healthy(self, conn):
+        # Pooled connections can be dropped by the server while idle
+        if conn.is_connected():
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                conn.reconnect(attempts=1, delay=0)
+                with self._stats_lock:
+                    self._stats["reconnects"] += 1
+                return
+            except (errors.InterfaceError, errors.OperationalError):
+                if attempt == self.max_retries:
+                    conn.close()
+                    raise
+                self._backoff(attempt)
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        acquired = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            held = time.perf_counter() - acquired
+            with self._stats_lock:
+                self._stats["held_total"] += held
+                self._stats["held_max"] = max(self._stats["held_max"], held)
+            # Returns the connection to the pool
+            conn.close()
+
+    @contextmanager
+    def cursor(self, commit=False, **cursor_kwargs):
+        """Borrow a connection and yield a cursor that is closed on exit.
+
+        With commit=True the transaction is committed when the block succeeds
+        and rolled back when it raises.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor(**cursor_kwargs)
+            try:
+                if commit and self.client_id:
+                    # Session variable read by the change_log triggers, cleared when the pool resets the session
+                    cursor.execute("SET @stock_client = %s", (self.client_id,))
+                yield cursor
+                if commit:
+                    conn.commit()
+            except Exception:
+                if commit:
+                    conn.rollback()
+                raise
+            finally:
+                self._close_cursor(conn, cursor)
+
+    @staticmethod
+    def _close_cursor(conn, cursor):
+        try:
+            cursor.close()
+        except errors.InternalError:
+            # Rows left unread by an abandoned streaming query
+            conn.consume_results()
+            cursor.close()
+
+    def fetchall(self, query, params=None):
+        with self.cursor() as cursor:
+            cursor.execute(query, params or ())
+            return cursor.fetchall()
+
+    def fetchone(self, query, params=None):
+        with self.cursor() as cursor:
+            cursor.execute(query, params or ())
+            return cursor.fetchone()
+
+    def execute(self, query, params=None):
+        with self.cursor(commit=True) as cursor:
+            cursor.execute(query, params or ())
+            return cursor.rowcount
+
+    def kill_query(self, connection_id):
+        """Abort the statement currently running on another connection."""
+        with self._side_lock:
+            if self._side_conn is None or not self._side_conn.is_connected():
+                self._side_conn = mysql.connector.connect(**self.config)
+            cursor = self._side_conn.cursor()
+            try:
+                cursor.execute(f"KILL QUERY {int(connection_id)}")
+            except errors.DatabaseError as err:
+                # Unknown thread id: the query already finished
+                if err.errno != 1094:
+                    raise
+            finally:
+                cursor.close()
+
+    def stats(self):
+        # Pool wait time is how long a caller waited for a free connection,
+        # checkout latency is how long the connection was held before release
+        with self._stats_lock:
+            checkouts = self._stats["checkouts"]
+            return {
+                "checkouts": checkouts,
+                "avg_wait_ms": (self._stats["wait_total"] / checkouts * 1000) if checkouts else 0.0,
+                "max_wait_ms": self._stats["wait_max"] * 1000,
+                "avg_checkout_ms": (self._stats["held_total"] / checkouts * 1000) if checkouts else 0.0,
+                "max_checkout_ms": self._stats["held_max"] * 1000,
+                "reconnects": self._stats["reconnects"],
+                "failed_checkouts": self._stats["failed_checkouts"],
+            }
+
+
+# Sort columns that can never hold NULL, so keyset predicates can skip the NULL branches
+NOT_NULL_COLUMNS = {"p.id", "p.name", "c.name"}
+
+
+def keyset_condition(column, value, row_id, descending=False, inclusive=False):
+    """Build the WHERE clause selecting rows that sort after (value, row_id).
+
+    Rows are ordered by `column` and then `p.id` in the same direction, which
+    makes every position unique. MySQL sorts NULLs first ascending and last
+    descending, and nullable columns are handled accordingly. With
+    inclusive=True the anchor row itself is part of the result.
+    """
+    op = "<" if descending else ">"
+    id_op = op + "=" if inclusive else op
+
+    if column == "p.id":
+        return f"p.id {id_op} %s", [row_id]
+
+    if value is None:
+        if descending:
+            return f"({column} IS NULL AND p.id {id_op} %s)", [row_id]
+        return f"({column} IS NOT NULL OR p.id {id_op} %s)", [row_id]
+
+    condition = f"{column} {op} %s OR ({column} = %s AND p.id {id_op} %s)"
+    if descending and column not in NOT_NULL_COLUMNS:
+        condition += f" OR {column} IS NULL"
+    return f"({condition})", [value, value, row_id]
+
+
+# InnoDB ignores shorter words in FULLTEXT indexes (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN = 3
+
+
+def product_search(search_term):
+    """Build the SQL fragments for the product search box.
+
+    Returns (join, where, params, relevance). Terms made of words of at
+    least FULLTEXT_MIN_TOKEN characters use the FULLTEXT index in boolean
+    prefix mode, ranked by relevance, with category names and exact
+    price/quantity values matched through their own indexes. Shorter terms
+    fall back to the substring LIKE search over every column.
+    """
+    term = search_term.strip().lower()
+    if not term:
+        return "", "", [], None
+
+    words = re.findall(r"\w+", term)
+    if not words or any(len(word) < FULLTEXT_MIN_TOKEN for word in words):
+        pattern = f"%{term}%"
+        where = """ AND (
+            LOWER(p.name) LIKE %s OR 
+            LOWER(p.description) LIKE %s OR 
+            CAST(p.price AS CHAR) LIKE %s OR 
+            CAST(p.quantity AS CHAR) LIKE %s OR 
+            LOWER(c.name) LIKE %s
+        )"""
+        return "", where, [pattern] * 5, None
+
+    boolean_query = " ".join(f"+{word}*" for word in words)
+    branches = ["""
+        SELECT id, MATCH(name, description) AGAINST (%s IN BOOLEAN MODE) AS relevance
+        FROM product
+        WHERE MATCH(name, description) AGAINST (%s IN BOOLEAN MODE)
+    """, """
+        SELECT sp.id, 0 FROM product sp
+        JOIN category sc ON sp.id_category = sc.id
+        WHERE LOWER(sc.name) LIKE %s
+    """]
+    params = [boolean_query, boolean_query, f"%{term}%"]
+
+    if term.isdigit():
+        branches.append("SELECT id, 0 FROM product WHERE price = %s")
+        branches.append("SELECT id, 0 FROM product WHERE quantity = %s")
+        params.extend([int(term), int(term)])
+
+    # Each branch is served by its own index; UNION ALL avoids an OR that would force a scan
+    join = f"""
+        JOIN (
+            SELECT id, MAX(relevance) AS relevance
+            FROM ({" UNION ALL ".join(branches)}) matches
+            GROUP BY id
+        ) search ON search.id = p.id
+    """
+    return join, "", params, "search.relevance DESC"
@@ -0,0 +1,247 @@
+"""Incremental CSV exports: one base snapshot per export profile, then deltas.
+
+Each profile (a set of search/filter criteria) lives in its own directory
+with a manifest recording the base file, the deltas written since, and the
+change_log version the last export reached. A delta holds only the rows
+added, changed or deleted since that version, read through change_log.
+
+Run as a script to rebuild a full snapshot from a profile directory:
+
+    python delta_export.py data-csv/deltas/all -o products_full.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from product_import import PRODUCT_COLUMNS
+from product_export import export_products, open_output
+
+
+MANIFEST = "manifest.json"
+DELTA_COLUMNS = ["Op"] + PRODUCT_COLUMNS
+
+# change_log is re-read this far before the previous export, so an entry
+# whose transaction committed late (after a higher id was already visible) is not missed
+GRACE_SECONDS = 300
+
+# Changed ids looked up per query
+ID_BATCH = 5000
+
+
+def profile_name(search, filters):
+    if not search and not filters:
+        return "all"
+    key = json.dumps({"search": search, "filters": filters}, sort_keys=True)
+    return "filtered-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(directory, manifest):
+    # Replaced in one step: an interrupted export leaves the previous manifest intact
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".part", path)
+
+
+def changed_product_ids(cursor, manifest):
+    """Ids of products changed since the manifest's version, or None if a new base is needed.
+
+    A new base is needed when the log no longer reaches back to that
+    version (pruned) or when a bulk load logged a single reload entry
+    instead of its rows.
+    """
+    since = manifest["version"]
+    cursor.execute("SELECT COALESCE(MIN(id), 0) FROM change_log")
+    if cursor.fetchone()[0] > since + 1:
+        return None
+
+    window_start = datetime.fromisoformat(manifest["exported_at"]) - timedelta(seconds=GRACE_SECONDS)
+    cursor.execute("""
+        SELECT DISTINCT table_name, row_id, action
+        FROM change_log
+        WHERE id > %s OR changed_at >= %s
+    """, (since, window_start))
+    product_ids, renamed_categories = set(), set()
+    for table, row_id, action in cursor.fetchall():
+        if action == 'R':
+            return None
+        if table == 'product':
+            product_ids.add(row_id)
+        elif action == 'U':
+            renamed_categories.add(row_id)
+
+    if renamed_categories:
+        # The category column of every product in a renamed category changed
+        placeholders = ', '.join(['%s'] * len(renamed_categories))
+        cursor.execute(f"SELECT id FROM product WHERE id_category IN ({placeholders})",
+                       sorted(renamed_categories))
+        product_ids.update(row[0] for row in cursor.fetchall())
+    return sorted(product_ids)
+
+
+def write_delta(db, query, params, order_by, ids, path, progress=None, cancelled=None):
+    """Write the current state of the given products as a delta file.
+
+    Products still matched by the profile's query become 'U' (upsert) rows;
+    the others were deleted or no longer match and become 'D' rows.
+    Returns (upserts, deletes), or None when cancelled.
+    """
+    partial = path + ".part"
+    upserts = deletes = 0
+    complete = False
+    try:
+        with open_output(partial) as f, db.cursor() as cursor:
+            writer = csv.writer(f)
+            writer.writerow(DELTA_COLUMNS)
+            for start in range(0, len(ids), ID_BATCH):
+                if cancelled is not None and cancelled():
+                    return None
+                batch = ids[start:start + ID_BATCH]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f"{query} AND p.id IN ({placeholders}) {order_by}", list(params) + batch)
+                found = set()
+                for row in cursor.fetchall():
+                    writer.writerow(("U",) + tuple(row))
+                    found.add(row[0])
+                for product_id in batch:
+                    if product_id not in found:
+                        writer.writerow(("D", product_id) + ("",) * (len(PRODUCT_COLUMNS) - 1))
+                upserts += len(found)
+                deletes += len(batch) - len(found)
+                if progress is not None:
+                    progress(start + len(batch))
+        complete = True
+    finally:
+        if complete:
+            os.replace(partial, path)
+        elif os.path.exists(partial):
+            os.remove(partial)
+    return upserts, deletes
+
+
+def export_delta(db, query, params, order_by, directory, profile=None, progress=None, cancelled=None):
+    """Export a profile incrementally into directory.
+
+    query is the profile's SELECT (ending in its WHERE clause, without the
+    ORDER BY). The first export, and any export the log cannot cover,
+    writes a new base and drops the files it replaces. Returns a dict
+    describing what was written, or None when cancelled.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+
+    # Read before the rows: changes made meanwhile are picked up again by the next delta
+    with db.cursor() as cursor:
+        cursor.execute("SELECT NOW(), COALESCE(MAX(id), 0) FROM change_log")
+        server_time, version = cursor.fetchone()
+        ids = changed_product_ids(cursor, manifest) if manifest else None
+    stamp = server_time.strftime("%Y%m%d_%H%M%S")
+
+    if ids is None:
+        filename = f"base_{version}_{stamp}.csv"
+        rows = export_products(db, f"{query} {order_by}", params, os.path.join(directory, filename),
+                               progress=progress, cancelled=cancelled)
+        if rows is None:
+            return None
+        obsolete = []
+        if manifest:
+            obsolete = [manifest["base"]["file"]] + [delta["file"] for delta in manifest["deltas"]]
+        save_manifest(directory, {
+            "profile": profile,
+            "base": {"file": filename, "version": version, "rows": rows},
+            "deltas": [],
+            "version": version,
+            "exported_at": server_time.isoformat(),
+        })
+        for name in obsolete:
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        return {"kind": "base", "file": filename, "rows": rows}
+
+    written = {"kind": "delta", "file": None, "upserts": 0, "deletes": 0}
+    if ids:
+        filename = f"delta_{manifest['version']}_{version}_{stamp}.csv"
+        result = write_delta(db, query, params, order_by, ids, os.path.join(directory, filename),
+                             progress, cancelled)
+        if result is None:
+            return None
+        upserts, deletes = result
+        manifest["deltas"].append({
+            "file": filename,
+            "from_version": manifest["version"],
+            "to_version": version,
+            "upserts": upserts,
+            "deletes": deletes,
+            "exported_at": server_time.isoformat(),
+        })
+        written.update(file=filename, upserts=upserts, deletes=deletes)
+    manifest["version"] = version
+    manifest["exported_at"] = server_time.isoformat()
+    save_manifest(directory, manifest)
+    return written
+
+
+def rebuild_snapshot(directory, output):
+    """Apply a profile's deltas to its base and write the full snapshot as CSV.
+
+    Rows keep their base order, rows added later are appended. Returns the
+    number of rows written.
+    """
+    manifest = load_manifest(directory)
+    if manifest is None:
+        raise ValueError(f"No {MANIFEST} in {directory}")
+
+    rows = {}
+    with open(os.path.join(directory, manifest["base"]["file"]), newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        if next(reader, None) != PRODUCT_COLUMNS:
+            raise ValueError(f"Unexpected header in {manifest['base']['file']}")
+        for record in reader:
+            rows[record[0]] = record
+
+    for delta in manifest["deltas"]:
+        with open(os.path.join(directory, delta["file"]), newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            if next(reader, None) != DELTA_COLUMNS:
+                raise ValueError(f"Unexpected header in {delta['file']}")
+            for op, *record in reader:
+                if op == "D":
+                    rows.pop(record[0], None)
+                else:
+                    rows[record[0]] = record
+
+    with open_output(output, compress=output.endswith(".gz")) as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_COLUMNS)
+        writer.writerows(rows.values())
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild a full product snapshot from a delta export profile.")
+    parser.add_argument("profile", help="profile directory, e.g. data-csv/deltas/all")
+    parser.add_argument("-o", "--output", help="output CSV (.csv.gz to compress), "
+                                               "defaults to snapshot_<version>.csv in the profile directory")
+    args = parser.parse_args(argv)
+
+    output = args.output
+    if output is None:
+        manifest = load_manifest(args.profile) or {}
+        output = os.path.join(args.profile, f"snapshot_{manifest.get('version', 0)}.csv")
+    count = rebuild_snapshot(args.profile, output)
+    print(f"Rebuilt {count} products into {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Versioned schema migrations for the Store database.
+
+Each migration runs once, in order, and is recorded in schema_migrations.
+MySQL commits DDL implicitly, so every step is written to be safe to re-run
+if a migration was interrupted halfway.
+"""
+
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = %s
+    """, (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return cursor.fetchone()[0] > 0
+
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def create_index(cursor, table, index_name, columns, kind="INDEX"):
+    # kind is INDEX, UNIQUE INDEX or FULLTEXT INDEX
+    if index_exists(cursor, table, index_name):
+        return
+    cursor.execute(f"CREATE {kind} {index_name} ON {table} ({columns})")
+
+
+def _create_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS category (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            price INT,
+            quantity INT,
+            id_category INT,
+            FOREIGN KEY (id_category) REFERENCES category(id)
+        )
+    """)
+
+
+def _add_indexes(cursor):
+    # Low stock chart and KPI (quantity < 10 ORDER BY quantity), covering the product name
+    create_index(cursor, "product", "idx_product_quantity_name", "quantity, name")
+    # Price histogram, price filters and sorting the table by price
+    create_index(cursor, "product", "idx_product_price", "price")
+    # Sorting the table by name
+    create_index(cursor, "product", "idx_product_name", "name")
+    # Per-category count, stock value and average price read from the index alone
+    create_index(cursor, "product", "idx_product_category_price_qty", "id_category, price, quantity")
+
+    # Merge duplicate category names into the oldest row before making the name unique
+    cursor.execute("""
+        UPDATE product p
+        JOIN category c ON p.id_category = c.id
+        JOIN (SELECT name, MIN(id) AS keep_id FROM category GROUP BY name) k ON k.name = c.name
+        SET p.id_category = k.keep_id
+        WHERE c.id <> k.keep_id
+    """)
+    cursor.execute("""
+        DELETE c FROM category c
+        JOIN (SELECT name, MIN(id) AS keep_id FROM category GROUP BY name) k ON k.name = c.name
+        WHERE c.id <> k.keep_id
+    """)
+    create_index(cursor, "category", "uq_category_name", "name", kind="UNIQUE INDEX")
+
+
+def _add_fulltext_index(cursor):
+    # Word and prefix search on the product search box
+    create_index(cursor, "product", "ft_product_name_description", "name, description", kind="FULLTEXT INDEX")
+
+
+# Products below this quantity count as low stock, in category_stats and on the dashboard
+LOW_STOCK_THRESHOLD = 10
+
+
+def _stats_values(row):
+    # Contribution of one product row to its category's line in category_stats
+    return (f"COALESCE({row}.id_category, 0), 1, COALESCE({row}.price * {row}.quantity, 0), "
+            f"COALESCE({row}.price, 0), {row}.price IS NOT NULL, "
+            f"COALESCE({row}.quantity < {LOW_STOCK_THRESHOLD}, 0)")
+
+
+def _stats_add(row):
+    return f"""
+        INSERT INTO category_stats
+            (category_id, product_count, stock_value, price_sum, price_count, low_stock_count)
+        VALUES ({_stats_values(row)})
+        ON DUPLICATE KEY UPDATE
+            product_count = product_count + VALUES(product_count),
+            stock_value = stock_value + VALUES(stock_value),
+            price_sum = price_sum + VALUES(price_sum),
+            price_count = price_count + VALUES(price_count),
+            low_stock_count = low_stock_count + VALUES(low_stock_count);
+    """
+
+
+def _stats_subtract(row):
+    return f"""
+        UPDATE category_stats SET
+            product_count = product_count - 1,
+            stock_value = stock_value - COALESCE({row}.price * {row}.quantity, 0),
+            price_sum = price_sum - COALESCE({row}.price, 0),
+            price_count = price_count - ({row}.price IS NOT NULL),
+            low_stock_count = low_stock_count - COALESCE({row}.quantity < {LOW_STOCK_THRESHOLD}, 0)
+        WHERE category_id = COALESCE({row}.id_category, 0);
+    """
+
+
+def _create_trigger(cursor, name, event, statements):
+    cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute(f"CREATE TRIGGER {name} {event} FOR EACH ROW BEGIN {statements} END")
+
+
+def _category_stats_triggers():
+    return {
+        "trg_product_stats_insert": ("AFTER INSERT ON product", _stats_add("NEW")),
+        "trg_product_stats_update": ("AFTER UPDATE ON product", _stats_subtract("OLD") + _stats_add("NEW")),
+        "trg_product_stats_delete": ("AFTER DELETE ON product", _stats_subtract("OLD")),
+        "trg_category_stats_delete": ("AFTER DELETE ON category",
+                                      "DELETE FROM category_stats WHERE category_id = OLD.id;"),
+    }
+
+
+def rebuild_category_stats(cursor):
+    """Recompute category_stats from the product table, for the backfill and after bulk loads."""
+    cursor.execute("DELETE FROM category_stats")
+    cursor.execute(f"""
+        INSERT INTO category_stats
+            (category_id, product_count, stock_value, price_sum, price_count, low_stock_count)
+        SELECT COALESCE(id_category, 0), COUNT(*), COALESCE(SUM(price * quantity), 0),
+               COALESCE(SUM(price), 0), COUNT(price), COALESCE(SUM(quantity < {LOW_STOCK_THRESHOLD}), 0)
+        FROM product
+        GROUP BY COALESCE(id_category, 0)
+    """)
+
+
+def _add_category_stats(cursor):
+    # One line per category (0 for products without one), kept exact by triggers on product
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category_id INT PRIMARY KEY,
+            product_count INT NOT NULL DEFAULT 0,
+            stock_value BIGINT NOT NULL DEFAULT 0,
+            price_sum BIGINT NOT NULL DEFAULT 0,
+            price_count INT NOT NULL DEFAULT 0,
+            low_stock_count INT NOT NULL DEFAULT 0
+        )
+    """)
+
+    for name, (event, statements) in _category_stats_triggers().items():
+        _create_trigger(cursor, name, event, statements)
+
+    # Backfill from the current rows; from here on the triggers keep it in sync
+    rebuild_category_stats(cursor)
+
+
+def _add_stock_value_column(cursor):
+    # Stored so it can be indexed: top products by value become an index read instead of a filesort
+    if not column_exists(cursor, "product", "stock_value"):
+        cursor.execute("ALTER TABLE product ADD COLUMN stock_value BIGINT AS (price * quantity) STORED")
+    create_index(cursor, "product", "idx_product_stock_value", "stock_value")
+
+
+def _add_change_log(cursor):
+    # Append-only feed of row changes, polled by every client to pick up the others' writes.
+    # client_id comes from the @stock_client session variable set by DatabasePool on writes.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            table_name VARCHAR(16) NOT NULL,
+            row_id INT NOT NULL,
+            action CHAR(1) NOT NULL,
+            client_id VARCHAR(32),
+            old_name VARCHAR(255),
+            old_price INT,
+            old_quantity INT,
+            old_category INT,
+            changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    create_index(cursor, "change_log", "idx_change_log_changed_at", "changed_at")
+
+    for name, (event, statements) in _change_log_triggers().items():
+        _create_trigger(cursor, name, event, statements)
+
+
+def _change_log_triggers():
+    columns = "table_name, row_id, action, client_id, old_name, old_price, old_quantity, old_category"
+    old_product = "OLD.name, OLD.price, OLD.quantity, OLD.id_category"
+    triggers = {
+        "trg_product_log_insert": ("AFTER INSERT ON product",
+                                   "'product', NEW.id, 'I', @stock_client, NULL, NULL, NULL, NULL"),
+        "trg_product_log_update": ("AFTER UPDATE ON product",
+                                   f"'product', NEW.id, 'U', @stock_client, {old_product}"),
+        "trg_product_log_delete": ("AFTER DELETE ON product",
+                                   f"'product', OLD.id, 'D', @stock_client, {old_product}"),
+        "trg_category_log_insert": ("AFTER INSERT ON category",
+                                    "'category', NEW.id, 'I', @stock_client, NULL, NULL, NULL, NULL"),
+        "trg_category_log_update": ("AFTER UPDATE ON category",
+                                    "'category', NEW.id, 'U', @stock_client, OLD.name, NULL, NULL, NULL"),
+        "trg_category_log_delete": ("AFTER DELETE ON category",
+                                    "'category', OLD.id, 'D', @stock_client, OLD.name, NULL, NULL, NULL"),
+    }
+    return {name: (event, f"INSERT INTO change_log ({columns}) VALUES ({values});")
+            for name, (event, values) in triggers.items()}
+
+
+def _skip_product_triggers_in_bulk_loads(cursor):
+    # A session with @bulk_load set skips the per-row work; the loader rebuilds
+    # category_stats and writes a single reload entry to change_log when it is done
+    triggers = dict(_category_stats_triggers(), **_change_log_triggers())
+    for name, (event, statements) in triggers.items():
+        if event.endswith(" ON product"):
+            _create_trigger(cursor, name, event, f"IF @bulk_load IS NULL THEN {statements} END IF;")
+
+
+MIGRATIONS = [
+    (1, "Create category and product tables", _create_base_tables),
+    (2, "Add product indexes and unique category names", _add_indexes),
+    (3, "Add FULLTEXT index on product name and description", _add_fulltext_index),
+    (4, "Add trigger-maintained category_stats summary table", _add_category_stats),
+    (5, "Add generated stock_value column with index", _add_stock_value_column),
+    (6, "Add trigger-fed change_log for multi-client refresh", _add_change_log),
+    (7, "Let bulk loads skip per-row product triggers", _skip_product_triggers_in_bulk_loads),
+]
+
+
+def run_migrations(conn):
+    """Apply every pending migration and return the versions that were applied."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        newly_applied = []
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            conn.commit()
+            newly_applied.append(version)
+        return newly_applied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# Hot queries of the dashboard and product table; each should be served by an index on product
+EXPLAIN_CHECKS = [
+    ("low stock", "SELECT name, quantity FROM product WHERE quantity < 10 ORDER BY quantity"),
+    ("low stock count", "SELECT COUNT(*) FROM product WHERE quantity < 10"),
+    ("sort by price", "SELECT id, price FROM product ORDER BY price, id LIMIT 10"),
+    ("sort by name", "SELECT id, name FROM product ORDER BY name, id LIMIT 10"),
+    ("price filter", "SELECT id FROM product WHERE price >= 0 AND price <= 100"),
+    ("category aggregates", """
+        SELECT c.name, s.product_count, s.stock_value, s.price_sum, s.price_count
+        FROM category c
+        LEFT JOIN category_stats s ON s.category_id = c.id
+        ORDER BY c.id
+    """),
+    ("top products by value", "SELECT id, stock_value FROM product ORDER BY stock_value DESC LIMIT 20"),
+    ("category lookup", "SELECT id FROM category WHERE name = 'Books'"),
+    ("fulltext search", "SELECT id FROM product WHERE MATCH(name, description) AGAINST ('+lap*' IN BOOLEAN MODE)"),
+]
+
+
+def verify_indexes(conn):
+    """EXPLAIN the hot queries and return (check, table, access type) for any full table scan."""
+    problems = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for name, query in EXPLAIN_CHECKS:
+            cursor.execute(f"EXPLAIN {query}")
+            for row in cursor.fetchall():
+                if row.get("table") in ("p", "product", "category") and not row.get("key"):
+                    problems.append((name, row.get("table"), row.get("type")))
+    finally:
+        cursor.close()
+    return problems
@@ -0,0 +1,168 @@
+import csv
+import gzip
+import json
+import os
+
+from mysql.connector import errors
+
+from product_import import PRODUCT_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional: only the Parquet and Arrow formats need it
+    pa = pq = None
+
+
+# Rows fetched from the server and written per batch
+EXPORT_BATCH = 5000
+# Columnar formats compress and scan better with larger record batches / row groups
+COLUMNAR_BATCH = 65536
+
+# Export format -> file extension
+EXPORT_FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+# Schema metadata key holding the export description (filters, search, sort)
+METADATA_KEY = b"stock_manager.export"
+
+
+def open_output(path, compress=False):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def stream_query(db, query, params, cancelled=None, batch_size=EXPORT_BATCH):
+    """Yield batches of rows read with an unbuffered cursor, so memory stays constant.
+
+    When the consumer stops early or cancelled() turns true, the rest of the
+    result is aborted on the server instead of being read to the end.
+    """
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        finished = False
+        try:
+            cursor.execute(query, params)
+            while cancelled is None or not cancelled():
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    finished = True
+                    break
+                yield rows
+        finally:
+            if not finished:
+                try:
+                    db.kill_query(conn.connection_id)
+                    conn.consume_results()
+                except errors.Error:
+                    # The interrupted statement reports an error while its remains are discarded
+                    pass
+            try:
+                cursor.close()
+            except errors.Error:
+                pass
+
+
+class CsvOutput:
+    batch_size = EXPORT_BATCH
+
+    def __init__(self, path, compress=False, metadata=None):
+        # CSV has nowhere to keep metadata
+        self.file = open_output(path, compress)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(PRODUCT_COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def product_schema(metadata=None):
+    fields = [
+        pa.field("ID", pa.int32(), nullable=False),
+        pa.field("Name", pa.string(), nullable=False),
+        pa.field("Description", pa.string()),
+        pa.field("Price", pa.int32()),
+        pa.field("Quantity", pa.int32()),
+        pa.field("Category", pa.string()),
+    ]
+    return pa.schema(fields, metadata={METADATA_KEY: json.dumps(metadata or {})})
+
+
+class ColumnarOutput:
+    """Typed record batches written to Parquet (zstd) or an Arrow IPC file.
+
+    The Arrow file is left uncompressed so readers can memory-map it with
+    pa.memory_map and use the columns without copying.
+    """
+
+    batch_size = COLUMNAR_BATCH
+
+    def __init__(self, path, fmt, metadata=None):
+        if pa is None:
+            raise RuntimeError("Parquet and Arrow export need the pyarrow package (pip install pyarrow)")
+        self.schema = product_schema(metadata)
+        if fmt == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+        self.fmt = fmt
+
+    def write(self, rows):
+        columns = zip(*rows)
+        batch = pa.record_batch([pa.array(values, type=field.type)
+                                 for values, field in zip(columns, self.schema)], schema=self.schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+        if self.fmt == "arrow":
+            self.sink.close()
+
+
+def open_export(path, fmt, metadata=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    if fmt in ("parquet", "arrow"):
+        return ColumnarOutput(path, fmt, metadata)
+    return CsvOutput(path, compress=fmt == "csv.gz", metadata=metadata)
+
+
+def export_products(db, query, params, path, fmt="csv", metadata=None, progress=None, cancelled=None):
+    """Write the result of a product query to path in the given EXPORT_FORMATS format.
+
+    Rows stream from the server in batches and never sit in memory all at
+    once. The file is written under a temporary name and only renamed into
+    place once complete. progress(rows) is called from the worker thread
+    after every batch. Returns the number of rows written, or None when
+    cancelled.
+    """
+    partial = path + ".part"
+    written = 0
+    complete = False
+    try:
+        output = open_export(partial, fmt, metadata)
+        try:
+            for rows in stream_query(db, query, params, cancelled, output.batch_size):
+                output.write(rows)
+                written += len(rows)
+                if progress is not None:
+                    progress(written)
+        finally:
+            output.close()
+        complete = cancelled is None or not cancelled()
+    finally:
+        if complete:
+            os.replace(partial, path)
+        elif os.path.exists(partial):
+            os.remove(partial)
+    return written if complete else None
@@ -0,0 +1,308 @@
+import csv
+import hashlib
+import os
+
+from migrations import rebuild_category_stats
+
+
+# Column layout written by export_data and read back by the importers
+PRODUCT_COLUMNS = ["ID", "Name", "Description", "Price", "Quantity", "Category"]
+
+# Rows per executemany batch and per transaction
+IMPORT_CHUNK = 5000
+
+UPSERT_PRODUCTS = """
+    INSERT INTO product (id, name, description, price, quantity, id_category)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name), description = VALUES(description),
+        price = VALUES(price), quantity = VALUES(quantity),
+        id_category = VALUES(id_category)
+"""
+
+# 64-bit digest of a product's content, computed the same way by row_hash() below.
+# NULL and empty descriptions hash alike, as the CSV cannot tell them apart. Category
+# names are lowercased: they are matched case-insensitively, so "books" is the same
+# category as "Books" and must not plan an update on every sync.
+PRODUCT_HASH_SQL = """
+    CAST(CONV(LEFT(MD5(CONCAT_WS(CHAR(31 USING utf8mb4), p.name, COALESCE(p.description, ''),
+                                 COALESCE(p.price, ''), COALESCE(p.quantity, ''), LOWER(COALESCE(c.name, '')))),
+                  16), 16, 10) AS UNSIGNED)
+"""
+
+
+def _number(value, line, column):
+    if value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            # pandas writes integer columns holding NaN as floats ("45.0")
+            return int(float(value))
+        except ValueError:
+            raise ValueError(f"Line {line}: {column} must be a number, got {value!r}")
+
+
+class ProductReader:
+    """Iterate over a products CSV as (id, name, description, price, quantity, category).
+
+    Tracks how many characters were read so far, for progress reporting.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.position = 0
+
+    def _lines(self, f):
+        for line in f:
+            self.position += len(line)
+            yield line
+
+    def __iter__(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(self._lines(f))
+            header = next(reader, None)
+            if header != PRODUCT_COLUMNS:
+                raise ValueError(f"Expected the columns {','.join(PRODUCT_COLUMNS)}, got {header}")
+
+            for line, record in enumerate(reader, start=2):
+                if not record:
+                    continue
+                if len(record) != len(PRODUCT_COLUMNS):
+                    raise ValueError(f"Line {line}: expected {len(PRODUCT_COLUMNS)} columns, got {len(record)}")
+                product_id, name, description, price, quantity, category = record
+                if not name or not category:
+                    raise ValueError(f"Line {line}: Name and Category are required")
+                yield (_number(product_id, line, "ID"), name, description or None,
+                       _number(price, line, "Price"), _number(quantity, line, "Quantity"), category)
+
+    @property
+    def fraction(self):
+        return min(self.position / self.size, 1.0) if self.size else 1.0
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def resolve_categories(cursor, names, known):
+    """Map category names to ids, creating the missing ones in one batch.
+
+    known maps lowercased names to ids and is updated in place.
+    """
+    missing = sorted({name for name in names if name.lower() not in known})
+    if missing:
+        cursor.executemany("""
+            INSERT INTO category (name) VALUES (%s)
+            ON DUPLICATE KEY UPDATE name = name
+        """, [(name,) for name in missing])
+        for name in missing:
+            # Looked up one by one: the collation may match a differently spelled existing name
+            cursor.execute("SELECT id FROM category WHERE name = %s", (name,))
+            known[name.lower()] = cursor.fetchone()[0]
+    return known
+
+
+def row_hash(row):
+    _, name, description, price, quantity, category = row
+    text = "\x1f".join([name, description or "",
+                        "" if price is None else str(price),
+                        "" if quantity is None else str(quantity),
+                        (category or "").lower()])
+    return int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "big")
+
+
+def upsert_chunk(cursor, chunk, known):
+    resolve_categories(cursor, (row[5] for row in chunk), known)
+    # executemany sends the chunk as one multi-row INSERT
+    cursor.executemany(UPSERT_PRODUCTS, [row[:5] + (known[row[5].lower()],) for row in chunk])
+
+
+def load_categories(cursor):
+    cursor.execute("SELECT id, name FROM category")
+    return {name.lower(): category_id for category_id, name in cursor.fetchall()}
+
+
+def begin_bulk_load(cursor):
+    # Product triggers skip their per-row work for this session (migration 7)
+    cursor.execute("SET @bulk_load = 1")
+
+
+def end_bulk_load(cursor, client_id):
+    """Catch up on what the skipped triggers would have done, then re-enable them."""
+    rebuild_category_stats(cursor)
+    # A single entry telling every client to reload, instead of one per row
+    cursor.execute("""
+        INSERT INTO change_log (table_name, row_id, action, client_id)
+        VALUES ('product', 0, 'R', %s)
+    """, (client_id,))
+    cursor.execute("SET @bulk_load = NULL")
+
+
+def end_bulk_load_after_error(conn, cursor, client_id):
+    # Often fails the same way when the connection is gone; the pool resets the
+    # session variable anyway, and the load's own error is the one to report
+    try:
+        end_bulk_load(cursor, client_id)
+        conn.commit()
+    except Exception as error:
+        print(f"Could not end the bulk load after an error: {error}")
+
+
+def import_products(db, path, client_id=None, progress=None, cancelled=None, chunk_size=IMPORT_CHUNK):
+    """Load a products CSV in the export layout, in batched transactions.
+
+    Rows with an ID that already exists are updated in place, the others are
+    inserted (with a new id when ID is empty). Missing categories are
+    created. Each chunk is committed on its own, so a cancelled or failed
+    import keeps the chunks before it. progress(rows, fraction) is called
+    from the worker thread after every chunk.
+
+    Returns a dict with the number of rows read and categories created.
+    """
+    reader = ProductReader(path)
+    imported = 0
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            known = load_categories(cursor)
+            initial_categories = len(known)
+
+            begin_bulk_load(cursor)
+            try:
+                for chunk in chunks(reader, chunk_size):
+                    if cancelled is not None and cancelled():
+                        break
+                    upsert_chunk(cursor, chunk, known)
+                    conn.commit()
+                    imported += len(chunk)
+                    if progress is not None:
+                        progress(imported, reader.fraction)
+            except Exception:
+                conn.rollback()
+                end_bulk_load_after_error(conn, cursor, client_id)
+                raise
+            end_bulk_load(cursor, client_id)
+            conn.commit()
+        finally:
+            cursor.close()
+
+    return {"rows": imported, "categories": len(known) - initial_categories}
+
+
+class SyncPlan:
+    """Differences between a snapshot file and the product table, keyed on ID.
+
+    inserts holds file rows that are new (unknown or empty ID), updates the
+    rows whose content hash differs, deletes the ids missing from the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.inserts = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+
+    @property
+    def changes(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def summary(self):
+        return (f"{len(self.inserts):,} to insert, {len(self.updates):,} to update, "
+                f"{len(self.deletes):,} to delete, {self.unchanged:,} unchanged")
+
+
+def plan_sync(db, path, progress=None, cancelled=None):
+    """Compare a snapshot file with the product table without writing anything.
+
+    Only a 64-bit hash per existing product is held in memory, plus the rows
+    that differ. progress(fraction) is called from the worker thread.
+    Returns None when cancelled.
+    """
+    current = {}
+    with db.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT p.id, {PRODUCT_HASH_SQL}
+            FROM product p
+            LEFT JOIN category c ON p.id_category = c.id
+        """)
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            current.update(rows)
+
+    plan = SyncPlan(path)
+    reader = ProductReader(path)
+    seen = set()
+    for count, row in enumerate(reader, start=1):
+        product_id = row[0]
+        if product_id is not None and product_id in seen:
+            raise ValueError(f"ID {product_id} appears more than once in {os.path.basename(path)}")
+        if product_id is None or product_id not in current:
+            plan.inserts.append(row)
+        elif current[product_id] != row_hash(row):
+            plan.updates.append(row)
+        else:
+            plan.unchanged += 1
+        if product_id is not None:
+            seen.add(product_id)
+
+        if count % IMPORT_CHUNK == 0:
+            if cancelled is not None and cancelled():
+                return None
+            if progress is not None:
+                progress(reader.fraction)
+
+    plan.deletes = sorted(product_id for product_id in current if product_id not in seen)
+    return plan
+
+
+def apply_sync(db, plan, client_id=None, progress=None, cancelled=None, chunk_size=IMPORT_CHUNK):
+    """Write a SyncPlan in batched transactions, touching only the rows that differ.
+
+    Rows changed by someone else between planning and applying are
+    overwritten with the file's version. progress(done, total) is called
+    from the worker thread after every batch. Returns the number of rows
+    written.
+    """
+    done = 0
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            known = load_categories(cursor)
+            begin_bulk_load(cursor)
+            try:
+                batches = [("upsert", chunk) for chunk in chunks(plan.inserts + plan.updates, chunk_size)]
+                batches += [("delete", chunk) for chunk in chunks(plan.deletes, chunk_size)]
+                for kind, chunk in batches:
+                    if cancelled is not None and cancelled():
+                        break
+                    if kind == "upsert":
+                        upsert_chunk(cursor, chunk, known)
+                    else:
+                        placeholders = ', '.join(['%s'] * len(chunk))
+                        cursor.execute(f"DELETE FROM product WHERE id IN ({placeholders})", chunk)
+                    conn.commit()
+                    done += len(chunk)
+                    if progress is not None:
+                        progress(done, plan.changes)
+            except Exception:
+                conn.rollback()
+                end_bulk_load_after_error(conn, cursor, client_id)
+                raise
+            end_bulk_load(cursor, client_id)
+            conn.commit()
+        finally:
+            cursor.close()
+    return done
@@ -0,0 +1,118 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueryTask:
+    """A unit of background work identified by a key.
+
+    Submitting a new task with the same key cancels the previous one, so only
+    the latest request for e.g. "products" ever reaches the UI.
+    """
+
+    def __init__(self, key, fn, on_success=None, on_error=None):
+        self.key = key
+        self.fn = fn
+        self.on_success = on_success
+        self.on_error = on_error
+        self.future = None
+        # Set by queries that can be aborted server-side with KILL QUERY. Change it and
+        # send the KILL only while holding lock, so the kill cannot hit the connection
+        # after it went back to the pool and runs another caller's statement
+        self.connection_id = None
+        self.lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class QueryExecutor:
+    """Runs database work on a thread pool and hands results back to Tk.
+
+    Worker threads never touch widgets: results are queued and drained on the
+    Tk main loop with root.after, where the success/error callbacks run.
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=15):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self._results = queue.Queue()
+        self._active = {}
+        self._polling = False
+
+    def submit(self, key, fn, on_success=None, on_error=None):
+        # fn runs on a worker thread and receives the task so it can check task.cancelled
+        self.cancel(key)
+        task = QueryTask(key, fn, on_success, on_error)
+        self._active[key] = task
+        task.future = self._pool.submit(self._run, task)
+        self._schedule_poll()
+        return task
+
+    def cancel(self, key):
+        task = self._active.pop(key, None)
+        if task is not None:
+            task.cancel()
+        return task
+
+    def run_detached(self, fn):
+        # Fire-and-forget work whose result nobody waits for
+        return self._pool.submit(fn)
+
+    def is_pending(self, key):
+        return key in self._active
+
+    def shutdown(self):
+        for key in list(self._active):
+            self.cancel(key)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, task):
+        if task.cancelled:
+            return
+        try:
+            result = task.fn(task)
+            self._results.put((task, result, None))
+        except Exception as e:
+            self._results.put((task, None, e))
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                task, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            # Drop results of tasks that were cancelled or superseded meanwhile
+            if task.cancelled or self._active.get(task.key) is not task:
+                continue
+            del self._active[task.key]
+
+            try:
+                if error is not None:
+                    if task.on_error:
+                        task.on_error(error)
+                    else:
+                        print(f"Background query '{task.key}' failed: {error}")
+                elif task.on_success:
+                    task.on_success(result)
+            except Exception as e:
+                print(f"Error in callback for '{task.key}': {e}")
+
+        if self._active:
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
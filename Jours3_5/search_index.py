@@ -0,0 +1,130 @@
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+
+
+def word_trigrams(text):
+    """Trigrams of every word in text, padded so prefixes weigh more than inner grams."""
+    grams = set()
+    for word in re.findall(r"\w+", (text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-memory trigram index over product name, description and category name.
+
+    Rows are the same tuples the product table displays:
+    (id, name, description, price, quantity, category). The index keeps
+    them so searches can be answered and filtered without a database round
+    trip, and ranks matches by the share of query trigrams they contain,
+    which tolerates typos and partial words.
+    """
+
+    def __init__(self, min_score=0.5):
+        self.min_score = min_score
+        self.rows = {}
+        self._postings = defaultdict(set)
+        self._grams = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def _document(row):
+        return f"{row[1]} {row[2] or ''} {row[5]}"
+
+    @staticmethod
+    def _contains(row, term):
+        _, name, description, price, quantity, category = row
+        return any(term in str(value).lower()
+                   for value in (name, description, price, quantity, category)
+                   if value is not None)
+
+    def add(self, row):
+        with self._lock:
+            if row[0] in self.rows:
+                self.remove(row[0])
+            grams = word_trigrams(self._document(row))
+            for gram in grams:
+                self._postings[gram].add(row[0])
+            self._grams[row[0]] = grams
+            self.rows[row[0]] = tuple(row)
+
+    def update(self, row):
+        self.add(row)
+
+    def remove(self, product_id):
+        with self._lock:
+            grams = self._grams.pop(product_id, ())
+            for gram in grams:
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(product_id)
+                    if not ids:
+                        del self._postings[gram]
+            self.rows.pop(product_id, None)
+
+    def remove_category(self, category_name):
+        with self._lock:
+            for product_id in [pid for pid, row in self.rows.items() if row[5] == category_name]:
+                self.remove(product_id)
+
+    def get(self, product_id):
+        return self.rows.get(product_id)
+
+    def search(self, term):
+        """Return matching rows, best match first."""
+        term = term.strip().lower()
+        with self._lock:
+            if not term:
+                return [self.rows[pid] for pid in sorted(self.rows)]
+
+            # Words this short give no trigram beyond their prefix, so scan
+            # every row for the substring instead, like the database's LIKE fallback
+            words = re.findall(r"\w+", term)
+            if not words or any(len(word) < 3 for word in words):
+                return [self.rows[pid] for pid in sorted(self.rows)
+                        if self._contains(self.rows[pid], term)]
+
+            query_grams = word_trigrams(term)
+            hits = Counter()
+            for gram in query_grams:
+                hits.update(self._postings.get(gram, ()))
+
+            scored = {}
+            if query_grams:
+                for product_id, count in hits.items():
+                    score = count / len(query_grams)
+                    if score >= self.min_score:
+                        row = self.rows[product_id]
+                        # Exact substring matches outrank fuzzy ones
+                        if term in self._document(row).lower():
+                            score += 1.0
+                        scored[product_id] = score
+
+            # Numbers match exact prices and quantities, like the database search
+            if term.isdigit():
+                value = int(term)
+                for product_id, row in self.rows.items():
+                    if row[3] == value or row[4] == value:
+                        scored[product_id] = max(scored.get(product_id, 0), 2.0)
+
+            ranked = sorted(scored.items(), key=lambda item: (-item[1], item[0]))
+            return [self.rows[pid] for pid, _ in ranked]
+
+    def memory_footprint(self):
+        """Approximate memory used by the index in bytes (rows, postings and per-row grams)."""
+        size = sys.getsizeof
+        with self._lock:
+            total = size(self.rows) + size(self._postings) + size(self._grams)
+            for row in self.rows.values():
+                total += size(row) + sum(size(value) for value in row)
+            for gram, ids in self._postings.items():
+                total += size(gram) + size(ids)
+            for grams in self._grams.values():
+                total += size(grams)
+        return total
@@ -1,27 +1,73 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
 import mysql.connector
-import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import seaborn as sns
 from datetime import datetime
 from PIL import Image , ImageTk
 import os
 from dotenv import load_dotenv
 import json
-from textwrap import wrap
-import gc  # Import garbage collector for memory management
+import time
+import uuid
+import tracemalloc
+from database import DatabasePool, product_search
+from query_executor import QueryExecutor
+from migrations import run_migrations, verify_indexes
+from search_index import TrigramIndex
+from product_import import import_products, plan_sync, apply_sync
+from product_export import export_products, EXPORT_FORMATS
+from delta_export import export_delta, profile_name, GRACE_SECONDS
+from dashboard import load_snapshot, ProductChange
+from charts import BarChart, HorizontalBarChart, PieChart, HistogramChart, format_money
+from virtual_table import VirtualTreeview, ListRowSource, KeysetRowSource, IdListRowSource
 
 load_dotenv()
 
 class StockManager:
+    # Quiet period after the last keystroke before a search query is sent
+    SEARCH_DEBOUNCE_MS = 300
+    
+    # How often other clients' changes are picked up from change_log, and how many per poll
+    CHANGE_POLL_MS = int(os.getenv("CHANGE_POLL_MS", "2000"))
+    CHANGE_BATCH = 500
+    # Skipped change_log ids watched for a late commit, oldest dropped first
+    MAX_CHANGE_GAPS = 1000
+    
+    # Export format choices -> product_export format names
+    EXPORT_FORMAT_LABELS = {
+        "CSV": "csv",
+        "CSV (gzip)": "csv.gz",
+        "Parquet": "parquet",
+        "Arrow IPC": "arrow",
+        "CSV delta": "delta",
+    }
+
+    # Product table column -> (SQL sort expression, index in a product row)
+    SORT_COLUMNS = {
+        "ID": ("p.id", 0),
+        "Name": ("p.name", 1),
+        "Description": ("p.description", 2),
+        "Price": ("p.price", 3),
+        "Quantity": ("p.quantity", 4),
+        "Category": ("c.name", 5)
+    }
+
+    PRODUCT_COUNT = "SELECT COUNT(*) FROM product"
+
+    PRODUCT_SELECT = """
+        SELECT p.id, p.name, p.description, p.price, p.quantity, c.name 
+        FROM product p 
+        JOIN category c ON p.id_category = c.id
+    """
+
     def __init__(self):
         # Initialize themed widgets registry
         self._themed_widgets = []
+        self._loading_overlays = {}
         self.load_theme_preference()
         self.setup_color_schemes()
         self.setup_database()
@@ -282,7 +328,7 @@ class StockManager:
         # Update charts with new color scheme
         self.update_charts()
         
-        self.load_products()
+        self.virtual_table.refresh()
         
     def update_widget_theme(self, widget):
         if isinstance(widget, ctk.CTkFrame):
@@ -319,65 +365,85 @@ class StockManager:
     def setup_database(self):
     
         try:
-            self.conn = mysql.connector.connect(
+            DatabasePool.bootstrap(
                 host="localhost",
                 user="root",
-                password=os.getenv("DB_PASSWORD")
+                password=os.getenv("DB_PASSWORD"),
+                database="Store"
             )
-            cursor = self.conn.cursor()
-            
-            cursor.execute("CREATE DATABASE IF NOT EXISTS Store")
-            cursor.execute("USE Store")
+            self.db = DatabasePool(
+                host="localhost",
+                user="root",
+                password=os.getenv("DB_PASSWORD"),
+                database="Store",
+                pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+                client_id=uuid.uuid4().hex
+            )
+            # Total number of products, None until counted again after rows were added or removed
+            self._product_count = None
+            # Category name -> id, loaded on first use and updated by category writes
+            self._category_ids = None
             
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS category (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL
-                )
-            """)
+            # Bring the schema (tables and indexes) up to date
+            with self.db.connection() as conn:
+                applied = run_migrations(conn)
+                if applied:
+                    print(f"Applied schema migrations: {applied}")
+                    for check, table, access in verify_indexes(conn):
+                        print(f"Warning: '{check}' scans {table} without an index ({access})")
             
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS product (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    price INT,
-                    quantity INT,
-                    id_category INT,
-                    FOREIGN KEY (id_category) REFERENCES category(id)
-                )
-            """)
-            cursor.execute("SELECT COUNT(*) FROM category")
-            if cursor.fetchone()[0] == 0:
-                categories = ["Electronics", "Clothing", "Food", "Books"]
-                for cat in categories:
-                    cursor.execute("INSERT INTO category (name) VALUES (%s)", (cat,))
+            # Clients only read the change feed from where it ended when they started; delta exports
+            # read it back to their last version, and the newest entry shows how far the log reaches
+            self.db.execute("""
+                DELETE FROM change_log
+                WHERE changed_at < NOW() - INTERVAL %s DAY
+                  AND id < (SELECT last_id FROM (SELECT MAX(id) AS last_id FROM change_log) newest)
+            """, (int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "7")),))
             
-            cursor.execute("SELECT COUNT(*) FROM product")
-            if cursor.fetchone()[0] == 0:
-                sample_products = [
-                    ("Laptop", "High-performance laptop", 999, 10, 1),
-                    ("T-shirt", "Cotton t-shirt", 20, 100, 2),
-                    ("Chocolate", "Dark chocolate bar", 5, 200, 3),
-                    ("Python Book", "Programming guide", 45, 50, 4)
-                ]
-                cursor.execute("SELECT id FROM category")
-                categories = cursor.fetchall()
-                for i, prod in enumerate(sample_products):
-                    cursor.execute("""
-                        INSERT INTO product (name, description, price, quantity, id_category)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, prod)
-            
-            self.conn.commit()
+            with self.db.cursor(commit=True) as cursor:
+                cursor.execute("SELECT COUNT(*) FROM category")
+                if cursor.fetchone()[0] == 0:
+                    categories = ["Electronics", "Clothing", "Food", "Books"]
+                    for cat in categories:
+                        cursor.execute("INSERT INTO category (name) VALUES (%s)", (cat,))
+                
+                cursor.execute("SELECT COUNT(*) FROM product")
+                if cursor.fetchone()[0] == 0:
+                    sample_products = [
+                        ("Laptop", "High-performance laptop", 999, 10, 1),
+                        ("T-shirt", "Cotton t-shirt", 20, 100, 2),
+                        ("Chocolate", "Dark chocolate bar", 5, 200, 3),
+                        ("Python Book", "Programming guide", 45, 50, 4)
+                    ]
+                    for prod in sample_products:
+                        cursor.execute("""
+                            INSERT INTO product (name, description, price, quantity, id_category)
+                            VALUES (%s, %s, %s, %s, %s)
+                        """, prod)
             
         except mysql.connector.Error as err:
             messagebox.showerror("Database Error", f"Error: {err}")
             
+    def report_pool_stats(self):
+        # Print pool wait time and checkout latency for diagnostics
+        stats = self.db.stats()
+        print(
+            f"DB pool: {stats['checkouts']} checkouts, "
+            f"wait avg {stats['avg_wait_ms']:.1f}ms / max {stats['max_wait_ms']:.1f}ms, "
+            f"checkout avg {stats['avg_checkout_ms']:.1f}ms / max {stats['max_checkout_ms']:.1f}ms, "
+            f"{stats['reconnects']} reconnects"
+        )
+            
     def setup_gui(self):
         self.root = ctk.CTk()
         self.root.title("Stock Manager Pro")
         self.root.geometry("1400x900")
+        
+        # Database work runs on background threads, results come back through root.after
+        self.executor = QueryExecutor(self.root)
+        # Imports and exports get their own workers (one each), so a long job never holds up the
+        # interactive queries and KILL requests waiting on the shared pool
+        self.job_executor = QueryExecutor(self.root, max_workers=2)
         ctk.set_appearance_mode(self.current_theme)
         
         self.fonts = {
@@ -448,7 +514,10 @@ class StockManager:
         self.create_action_buttons()
         self.create_charts()
         
+        # Feed first: everything loaded after it is at least as recent as its starting point
+        self.start_change_feed()
         self.load_products()
+        self.build_search_index()
         
     def create_header(self):
         # Header frame
@@ -493,18 +562,11 @@ class StockManager:
         stats_frame = ctk.CTkFrame(self.header_frame, fg_color=self.colors['primary'])
         stats_frame.pack(side="right", padx=20, pady=20)
         
-        cursor = self.conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM product")
-        total_products = cursor.fetchone()[0]
-        
-        # Total stock value
-        cursor.execute("SELECT SUM(price * quantity) FROM product")
-        total_value = cursor.fetchone()[0] or 0
-        
-        # Stat cards
-        self.create_stat_card(stats_frame, "Total Products", str(total_products), "📦")
-        self.create_stat_card(stats_frame, "Total Stock Value", f"${total_value:,}", "💰")
+        # Stat cards, filled in from the dashboard snapshot by update_kpis
+        self.stat_labels = {
+            'total_products': self.create_stat_card(stats_frame, "Total Products", "...", "📦"),
+            'total_value': self.create_stat_card(stats_frame, "Total Stock Value", "...", "💰")
+        }
         
     def create_stat_card(self, parent, title, value, icon):
         frame = ctk.CTkFrame(
@@ -533,12 +595,14 @@ class StockManager:
         ).pack(side="left")
         
         
-        ctk.CTkLabel(
+        value_label = ctk.CTkLabel(
             frame,
             text=value,
             font=self.fonts['subheading'],
             text_color="white"
-        ).pack(padx=10, pady=(0, 5))
+        )
+        value_label.pack(padx=10, pady=(0, 5))
+        return value_label
         
     def create_kpi_dashboard(self):
         self.kpi_frame = ctk.CTkFrame(self.main_container, fg_color=self.colors['background'])
@@ -548,62 +612,44 @@ class StockManager:
         for i in range(2):
             self.kpi_frame.grid_columnconfigure(i, weight=1)
         
-        # KPI Metrics
-        cursor = self.conn.cursor()
-        
-        # Total Products
-        cursor.execute("SELECT COUNT(*) FROM product")
-        total_products = cursor.fetchone()[0]
-        
-        # Low Stock Items (items with quantity < 10)
-        cursor.execute("SELECT COUNT(*) FROM product WHERE quantity < 10")
-        low_stock = cursor.fetchone()[0]
-        
-        # Total Inventory Value
-        cursor.execute("SELECT SUM(price * quantity) FROM product")
-        total_value = cursor.fetchone()[0] or 0
-        
-        # Category Count
-        cursor.execute("SELECT COUNT(*) FROM category")
-        category_count = cursor.fetchone()[0]
-        
-        # KPI cards
+        # KPI cards, values come from the dashboard snapshot (update_kpis)
         kpi_configs = [
             {
+                'key': 'total_products',
                 'title': 'Total Products',
-                'value': str(total_products),
                 'icon': '📦',
                 'color': self.colors['kpi_blue'],
                 'position': (0, 0)
             },
             {
+                'key': 'low_stock_count',
                 'title': 'Low Stock Items',
-                'value': str(low_stock),
                 'icon': '⚠️',
                 'color': self.colors['kpi_amber'],
                 'position': (0, 1)
             },
             {
+                'key': 'total_value',
                 'title': 'Total Inventory Value',
-                'value': f'${total_value:,}',
                 'icon': '💰',
                 'color': self.colors['kpi_green'],
                 'position': (1, 0)
             },
             {
+                'key': 'category_count',
                 'title': 'Categories',
-                'value': str(category_count),
                 'icon': '🏷️',
                 'color': self.colors['kpi_blue'],
                 'position': (1, 1)
             }
         ]
         
+        self.kpi_labels = {}
         for kpi in kpi_configs:
-            self.create_kpi_card(
+            self.kpi_labels[kpi['key']] = self.create_kpi_card(
                 self.kpi_frame,
                 title=kpi['title'],
-                value=kpi['value'],
+                value="...",
                 icon=kpi['icon'],
                 color=kpi['color'],
                 row=kpi['position'][0],
@@ -651,6 +697,18 @@ class StockManager:
         # Equal size for cards
         card.grid_propagate(False)
         card.configure(width=300, height=150) 
+        return value_label
+    
+    def update_kpis(self, snapshot):
+        values = {
+            'total_products': str(snapshot.total_products),
+            'low_stock_count': str(snapshot.low_stock_count),
+            'total_value': f"${snapshot.total_value:,}",
+            'category_count': str(snapshot.category_count)
+        }
+        for key, label in list(self.kpi_labels.items()) + list(self.stat_labels.items()):
+            if label.winfo_exists():
+                label.configure(text=values[key])
         
     def create_frames(self):
         # Frame for product list and filters
@@ -708,8 +766,13 @@ class StockManager:
         )
         search_entry.pack(side="left", fill="x", expand=True, padx=(5, 10), pady=0)
         
-        # Add search trace to filter products as typing
-        self.search_var.trace('w', self.filter_products)
+        # In-memory search index, built in the background after startup
+        self.search_index = None
+        self._index_backlog = []
+        
+        # Add search trace to filter products as typing (debounced)
+        self._search_after_id = None
+        self.search_var.trace('w', self.on_search_changed)
         
         # Advanced filters button intgrated with search container
         self.filters_active = False  # Track if filters are active
@@ -747,7 +810,7 @@ class StockManager:
             variable=self.page_size_var,
             width=70,
             height=35,
-            command=self.load_products,
+            command=self.on_page_size_changed,
             text_color=self.colors['text'],
             button_color=self.colors['primary'],
             button_hover_color=self.colors['secondary'],
@@ -758,8 +821,7 @@ class StockManager:
         )
         page_size_combo.pack(side="left", padx=5)
         
-        self.current_page = 1
-        self.total_pages = 1
+        self._sort_signature = None
         
         self.page_label = ctk.CTkLabel(
             pagination_frame,
@@ -791,6 +853,28 @@ class StockManager:
         )
         next_page_btn.pack(side="left", padx=2)
         
+        # Jump to page
+        self.jump_page_var = tk.StringVar()
+        jump_entry = self.create_themed_entry(
+            pagination_frame,
+            textvariable=self.jump_page_var,
+            width=50,
+            height=35
+        )
+        jump_entry.pack(side="left", padx=(10, 2))
+        jump_entry.bind("<Return>", self.jump_to_page)
+        
+        jump_btn = ctk.CTkButton(
+            pagination_frame,
+            text="Go",
+            width=35,
+            height=35,
+            command=self.jump_to_page,
+            fg_color=self.colors['primary'],
+            hover_color=self.colors['secondary']
+        )
+        jump_btn.pack(side="left", padx=2)
+        
         # Tree frame for product list
         self.tree_frame = ttk.Frame(product_content)
         self.tree_frame.pack(fill="both", expand=True, pady=(0, 5))
@@ -837,9 +921,10 @@ class StockManager:
                             command=lambda c=col: self.sort_treeview(c))
             self.tree.column(col, width=width, anchor="w")
         
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(self.tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar drives the virtual table, which keeps only the visible rows in the tree
+        scrollbar = ttk.Scrollbar(self.tree_frame, orient="vertical")
+        self.virtual_table = VirtualTreeview(self.tree, scrollbar, row_height=35,
+                                             on_render=self.update_page_label)
         
         self.tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
@@ -849,7 +934,6 @@ class StockManager:
         self.tree.tag_configure('hover', background=self.colors['primary'], foreground='white')
         
         # Bind events
-        self.tree.bind("<Motion>", self.on_hover)  # Hover effect
         self.tree.bind("<Button-3>", self.show_context_menu)  # Right-click menu
         self.tree.bind("<Double-1>", self.on_double_click)  # Double-click to edit
         
@@ -872,20 +956,9 @@ class StockManager:
         
         self.load_products()
     
-    def on_hover(self, event):
-        # Handle hover effect on Product Table rows
-        item = self.tree.identify_row(event.y)
-        if item:
-            self.tree.tag_configure("hover", 
-                                  background=self.colors['primary'],
-                                  foreground="white")
-            for prev_item in self.tree.tag_has("hover"):
-                self.tree.item(prev_item, tags=[])
-            self.tree.item(item, tags=["hover"])
-    
     def show_context_menu(self, event):
         item = self.tree.identify_row(event.y)
-        if item:
+        if item and not self.is_placeholder(item):
             self.tree.selection_set(item)
             self.context_menu.post(event.x_root, event.y_root)
     
@@ -893,9 +966,13 @@ class StockManager:
         # Handle double click to edit product 
         item = self.tree.identify_row(event.y)
         column = self.tree.identify_column(event.x)
-        if item and column:
+        if item and column and not self.is_placeholder(item):
             self.start_inline_edit(item, column)
     
+    def is_placeholder(self, item):
+        # Rows still being fetched by the virtual table
+        return 'placeholder' in self.tree.item(item, "tags")
+    
     def start_inline_edit(self, item, column):
         if column in ("#1", "#6"):  # Don't allow editing ID or Category
             return
@@ -903,6 +980,8 @@ class StockManager:
         # Get column name and current value
         col_name = self.tree.heading(column)["text"]
         current_value = self.tree.item(item)["values"][int(column[1]) - 1]
+        # The row before the edit, as loaded for display
+        old_row = self.virtual_table.displayed_row(item)
         
         # Create editing window
         edit_window = ctk.CTkToplevel(self.root)
@@ -937,26 +1016,36 @@ class StockManager:
                 values[col_index] = new_value
                 
                 # Update database
-                cursor = self.conn.cursor()
-                if col_name == "Name":
-                    cursor.execute("UPDATE product SET name = %s WHERE id = %s",
-                                 (new_value, values[0]))
-                elif col_name == "Description":
-                    cursor.execute("UPDATE product SET description = %s WHERE id = %s",
-                                 (new_value, values[0]))
-                elif col_name == "Price":
-                    cursor.execute("UPDATE product SET price = %s WHERE id = %s",
-                                 (new_value, values[0]))
-                elif col_name == "Quantity":
-                    cursor.execute("UPDATE product SET quantity = %s WHERE id = %s",
-                                 (new_value, values[0]))
+                with self.db.cursor(commit=True) as cursor:
+                    if old_row is None:
+                        row = self.fetch_product_row(cursor, values[0], lock=True)
+                    else:
+                        row = old_row
+                    if col_name == "Name":
+                        cursor.execute("UPDATE product SET name = %s WHERE id = %s",
+                                     (new_value, values[0]))
+                    elif col_name == "Description":
+                        cursor.execute("UPDATE product SET description = %s WHERE id = %s",
+                                     (new_value, values[0]))
+                    elif col_name == "Price":
+                        cursor.execute("UPDATE product SET price = %s WHERE id = %s",
+                                     (new_value, values[0]))
+                    elif col_name == "Quantity":
+                        cursor.execute("UPDATE product SET quantity = %s WHERE id = %s",
+                                     (new_value, values[0]))
+                    changed = cursor.rowcount > 0
+                    deleted = row is None or (not changed and not self.product_exists(cursor, values[0]))
                 
-                self.conn.commit()
+                edit_window.destroy()
+                if deleted:
+                    self.on_product_deleted_elsewhere(values[0])
+                    return
                 
                 # Update tree
                 self.tree.item(item, values=values)
-                edit_window.destroy()
-                self.update_charts()
+                if changed:
+                    new_row = row[:col_index] + (new_value,) + row[col_index + 1:]
+                    self.on_product_changed(ProductChange(row, new_row))
                 
             except ValueError:
                 messagebox.showerror("Error", "Invalid value for numeric field")
@@ -979,73 +1068,113 @@ class StockManager:
         values = self.tree.item(selected[0])["values"]
 
     def next_page(self):
-        if self.current_page < self.total_pages:
-            self.current_page += 1
-            self.load_products()
+        page_size = int(self.page_size_var.get())
+        self.virtual_table.scroll_to(self.virtual_table.first + page_size)
     
     def prev_page(self):
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.load_products()
+        page_size = int(self.page_size_var.get())
+        self.virtual_table.scroll_to(self.virtual_table.first - page_size)
+    
+    def on_page_size_changed(self, *args):
+        # The page size only sets how far the page buttons scroll
+        self.update_page_label(self.virtual_table.first, self.virtual_table.count)
+    
+    def update_page_label(self, first, count):
+        page_size = int(self.page_size_var.get())
+        total_pages = max(1, (count + page_size - 1) // page_size)
+        page = first // page_size + 1
+        if first + self.virtual_table.visible >= count:
+            page = total_pages
+        self.page_label.configure(text=f"Page {min(page, total_pages)} of {total_pages}")
+    
+    def invalidate_product_pages(self, count_changed=True):
+        # Called after our own and other clients' writes: the count is only stale if rows were added or removed
+        if count_changed:
+            self._product_count = None
+    
+    def set_product_count(self, count):
+        self._product_count = count
+    
+    def cached_product_count(self):
+        # Known total without a round trip, or None to let the first block fetch it
+        return self._product_count
+    
+    def category_ids(self, reload=False):
+        if self._category_ids is None or reload:
+            rows = self.db.fetchall("SELECT id, name FROM category ORDER BY id")
+            self._category_ids = {name: category_id for category_id, name in rows}
+        return self._category_ids
+    
+    def category_id(self, name):
+        # Reload once on a miss, the category may have been added by another client
+        category_id = self.category_ids().get(name)
+        if category_id is None:
+            category_id = self.category_ids(reload=True).get(name)
+        return category_id
+    
+    def category_names(self):
+        return list(self.category_ids())
     
     def load_products(self, *args):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        cursor = self.conn.cursor()
-        
-        # Get total count for pagination
-        cursor.execute("SELECT COUNT(*) FROM product")
-        total_items = cursor.fetchone()[0]
-        
-        # Calculate pagination
+        column, key_index = self.SORT_COLUMNS[self.sort_column]
+        descending = self.sort_reverse
+        
+        # Stay at the same position when reloading after a write, go back to the top on a new ordering
+        signature = (self.sort_column, descending)
+        keep_position = signature == self._sort_signature
+        self._sort_signature = signature
+        
+        # The whole catalog replaces any search still running
+        self.abort_running_search()
+        self.set_loading(self.tree_frame, False)
+        
+        source = KeysetRowSource(self.executor, self.db, self.PRODUCT_SELECT, column, key_index,
+                                 descending, count=self.cached_product_count(),
+                                 on_count=self.set_product_count)
+        self.virtual_table.set_source(source, keep_position=keep_position)
+    
+    def jump_to_page(self, *args):
+        try:
+            page = int(self.jump_page_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a valid page number")
+            return
         page_size = int(self.page_size_var.get())
-        self.total_pages = max(1, (total_items + page_size - 1) // page_size)
-        self.current_page = min(self.current_page, self.total_pages)
-        
-        # Update page label
-        self.page_label.configure(text=f"Page {self.current_page} of {self.total_pages}")
-        
-        # Map column names to SQL column names
-        column_map = {
-            "ID": "p.id",
-            "Name": "p.name",
-            "Description": "p.description",
-            "Price": "p.price",
-            "Quantity": "p.quantity",
-            "Category": "c.name"
-        }
-        
-        order_by = f"ORDER BY {column_map[self.sort_column]}"
-        if self.sort_reverse:
-            order_by += " DESC"
-        
-        # Calculate offset (based on current page)
-        offset = (self.current_page - 1) * page_size
-        
-        cursor.execute(f"""
-            SELECT p.id, p.name, p.description, p.price, p.quantity, c.name 
-            FROM product p 
-            JOIN category c ON p.id_category = c.id
-            {order_by}
-            LIMIT %s OFFSET %s
-        """, (page_size, offset))
-        
-        # Insert with alternating colors
-        for i, product in enumerate(cursor.fetchall()):
-            tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
-            self.tree.insert("", "end", values=product, tags=tags)
-        
-        # Configure row colors based on current theme
-        self.tree.tag_configure('evenrow', 
-                              background=self.colors['card_bg'],
-                              foreground=self.colors['text'])
-        self.tree.tag_configure('oddrow', 
-                              background=self.colors['hover'],
-                              foreground=self.colors['text'])
-        self.tree.tag_configure('hover', 
-                              background=self.colors['primary'],
-                              foreground='white')
+        self.jump_page_var.set("")
+        self.virtual_table.scroll_to((max(page, 1) - 1) * page_size)
+    
+    def display_products(self, products):
+        # Rows already in memory, the virtual table only inserts the visible ones
+        self.virtual_table.set_source(ListRowSource(products))
+    
+    def on_products_error(self, error):
+        self.set_loading(self.tree_frame, False)
+        messagebox.showerror("Error", f"Error loading products: {str(error)}")
+
+    def set_loading(self, widget, loading):
+        # Show or hide a "Loading..." overlay on top of a card while its query is in flight
+        overlay = self._loading_overlays.pop(widget, None)
+        if overlay is not None and overlay.winfo_exists():
+            overlay.destroy()
+        
+        if loading and widget.winfo_exists():
+            overlay = ctk.CTkLabel(
+                widget,
+                text="Loading...",
+                font=self.fonts['small'],
+                text_color=self.colors['primary'],
+                fg_color=self.colors['hover'],
+                corner_radius=8
+            )
+            overlay.place(relx=0.5, rely=0.5, anchor="center")
+            self._loading_overlays[widget] = overlay
+
+    def get_total_products(self):
+        # Runs on worker threads; the count is stored from the Tk thread only
+        count = self._product_count
+        if count is None:
+            count = self.db.fetchone(self.PRODUCT_COUNT)[0]
+        return count
 
     def create_action_buttons(self):
         # Create a card for the actions section
@@ -1129,7 +1258,7 @@ class StockManager:
         export_frame = ctk.CTkFrame(actions_content, fg_color="transparent")
         export_frame.pack(fill="x", side="bottom")
         
-        export_btn = ctk.CTkButton(
+        self.export_btn = ctk.CTkButton(
             export_frame,
             text="Export Data",
             command=self.export_data,
@@ -1138,7 +1267,38 @@ class StockManager:
             height=button_height, 
             corner_radius=button_corner_radius
         )
-        export_btn.pack(fill="x", pady=button_padding)
+        self.export_btn.pack(fill="x", pady=button_padding)
+        
+        self.export_format_var = tk.StringVar(value="CSV")
+        self.create_themed_combobox(
+            export_frame,
+            variable=self.export_format_var,
+            values=list(self.EXPORT_FORMAT_LABELS),
+            height=button_height,
+            state="readonly"
+        ).pack(fill="x", pady=button_padding)
+        
+        self.import_btn = ctk.CTkButton(
+            export_frame,
+            text="Import Data",
+            command=self.import_data,
+            fg_color=self.colors['warning'],
+            hover_color="#b45309",  
+            height=button_height, 
+            corner_radius=button_corner_radius
+        )
+        self.import_btn.pack(fill="x", pady=button_padding)
+        
+        self.sync_btn = ctk.CTkButton(
+            export_frame,
+            text="Sync Import",
+            command=self.sync_import,
+            fg_color=self.colors['warning'],
+            hover_color="#b45309",  
+            height=button_height, 
+            corner_radius=button_corner_radius
+        )
+        self.sync_btn.pack(fill="x", pady=button_padding)
         
     def create_charts(self):
         # Analytics dashboard section
@@ -1170,7 +1330,7 @@ class StockManager:
             segmented_button_unselected_hover_color=self.colors['secondary'],
             text_color=self.colors['text'],
             corner_radius=10,
-            command=lambda tab_name: self.save_tab_state(tab_name)  
+            command=lambda: self.save_tab_state(self.tab_view.get())  
         )
         self.tab_view.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
@@ -1186,6 +1346,14 @@ class StockManager:
             tab.grid_columnconfigure(1, weight=1)
             tab.configure(fg_color=self.colors['card_bg'])
         
+        # Chart objects and their card frames, kept across refreshes
+        self.charts = {}
+        self.chart_cards = {}
+        self._charts_theme = None
+        self._charts_loading = []
+        # Latest dashboard data and the tabs whose charts have not been drawn from it yet
+        self.dashboard_snapshot = None
+        self._dirty_tabs = set()
         self.charts_frames = {
             'overview': overview_tab,
             'products': products_tab,
@@ -1209,699 +1377,324 @@ class StockManager:
         except Exception as e:
             print(f"Error saving tab state: {e}")
         
+        # Charts of a tab are drawn the first time it is shown after the data changed
+        self.render_tab(tab_name)
+        
     def update_charts(self):
-        try:
-            for frame in self.charts_frames.values():
-                for widget in frame.winfo_children():
-                    widget.destroy()
-
-            # Close all existing figures and collect garbage
-            plt.close('all')
-            gc.collect()
-
-            plt.style.use('seaborn-v0_8-darkgrid' if self.current_theme == 'dark' else 'seaborn-v0_8')
-
-            bg_color = self.colors['card_bg']
-            text_color = self.colors['text']
-
-            plt.rcParams.update({
-                'figure.facecolor': bg_color,
-                'axes.facecolor': bg_color,
-                'axes.edgecolor': text_color,
-                'axes.labelcolor': text_color,
-                'xtick.color': text_color,
-                'ytick.color': text_color,
-                'text.color': text_color,
-                'font.size': 8,
-                'axes.titlesize': 10,
-                'axes.labelsize': 8,
-                'xtick.labelsize': 7,
-                'ytick.labelsize': 7,
-                'legend.fontsize': 8,
-                'figure.titlesize': 10,
-                'figure.subplot.left': 0.15,
-                'figure.subplot.right': 0.95,
-                'figure.subplot.top': 0.9,
-                'figure.subplot.bottom': 0.2,
-                'figure.subplot.wspace': 0.3,
-                'figure.subplot.hspace': 0.6,
-                'figure.max_open_warning': 50  
-            })
-
-            cursor = self.conn.cursor()
-
-            # Get colors from current theme
-            category_colors = self.chart_colors['category_colors']
-            bar_colors = self.chart_colors['bar_colors']
-            hist_colors = self.chart_colors['hist_colors']
-            top_products_colors = self.chart_colors['top_products_colors']
-
-            # Overview tab charts
-            overview_left_card, overview_left = self.create_card(
-                self.charts_frames['overview'],
-                title="Product Distribution",
-                icon="📊"
-            )
-            overview_left_card.grid(row=0, column=0, padx=15, pady=15, sticky="nsew")
-
-            overview_right_card, overview_right = self.create_card(
-                self.charts_frames['overview'],
-                title="Stock Value by Category",
-                icon="💰"
-            )
-            overview_right_card.grid(row=0, column=1, padx=15, pady=15, sticky="nsew")
-
-            self.create_product_distribution_chart(overview_left, category_colors)
-            self.create_stock_value_chart(overview_right, bar_colors)
-
-            # Products tab charts
-            products_left_card, products_left = self.create_card(
-                self.charts_frames['products'],
-                title="Price Distribution",
-                icon="📈"
-            )
-            products_left_card.grid(row=0, column=0, padx=15, pady=15, sticky="nsew")
-
-            products_right_card, products_right = self.create_card(
-                self.charts_frames['products'],
-                title="Top Products by Value",
-                icon="🏆"
-            )
-            products_right_card.grid(row=0, column=1, padx=15, pady=15, sticky="nsew")
-
-            products_bottom_card, products_bottom = self.create_card(
-                self.charts_frames['products'],
-                title="Quantity Distribution",
-                icon="📦"
-            )
-            products_bottom_card.grid(row=1, column=0, columnspan=2, padx=15, pady=15, sticky="nsew")
-
-            self.create_price_distribution_chart(products_left, hist_colors)
-            self.create_top_products_chart(products_right, top_products_colors)
-            self.create_quantity_distribution_chart(products_bottom, hist_colors)
-
-            # Categories tab charts
-            categories_left_card, categories_left = self.create_card(
-                self.charts_frames['categories'],
-                title="Products per Category",
-                icon="🏷️"
-            )
-            categories_left_card.grid(row=0, column=0, padx=15, pady=15, sticky="nsew")
-
-            categories_right_card, categories_right = self.create_card(
-                self.charts_frames['categories'],
-                title="Average Price by Category",
-                icon="💲"
-            )
-            categories_right_card.grid(row=0, column=1, padx=15, pady=15, sticky="nsew")
-
-            self.create_category_distribution_chart(categories_left, category_colors)
-            self.create_avg_price_chart(categories_right, bar_colors)
-
-            # Trends tab charts
-            trends_left_card, trends_left = self.create_card(
-                self.charts_frames['trends'],
-                title="Low Stock Items",
-                icon="⚠️"
-            )
-            trends_left_card.grid(row=0, column=0, padx=15, pady=15, sticky="nsew")
-
-            trends_right_card, trends_right = self.create_card(
-                self.charts_frames['trends'],
-                title="Value Distribution",
-                icon="📊"
-            )
-            trends_right_card.grid(row=0, column=1, padx=15, pady=15, sticky="nsew")
-
-            self.create_low_stock_chart(trends_left, bar_colors)
-            self.create_value_distribution_chart(trends_right, hist_colors)
+        # Keep the visible charts under a loading overlay until new data arrives
+        tab = self.tab_view.get().lower()
+        visible_cards = [card for card in self.chart_cards.values()
+                         if card.winfo_exists() and card.winfo_ismapped()]
+        self._charts_loading = visible_cards or [self.charts_frames[tab]]
+        for frame in self._charts_loading:
+            self.set_loading(frame, True)
+        
+        # Charts, KPI cards and header stats all render from one snapshot of the data
+        self.executor.submit("charts", lambda task: load_snapshot(self.db),
+                             on_success=self.render_dashboard,
+                             on_error=self.on_charts_error)
+    
+    def render_dashboard(self, snapshot):
+        for frame in self._charts_loading:
+            self.set_loading(frame, False)
+        self.update_kpis(snapshot)
+        
+        # Only the active tab is drawn now, hidden tabs when the user switches to them
+        self.dashboard_snapshot = snapshot
+        self._dirty_tabs = set(self.charts_frames)
+        self.render_tab(self.tab_view.get())
+    
+    def render_tab(self, tab_name):
+        tab = tab_name.lower()
+        if tab not in self._dirty_tabs or self.dashboard_snapshot is None:
+            return
+        self._dirty_tabs.discard(tab)
+        self.render_charts(tab, self.dashboard_snapshot)
+    
+    def on_charts_error(self, error):
+        for frame in self._charts_loading:
+            self.set_loading(frame, False)
+        print(f"Error in update_charts: {error}")
+        messagebox.showerror("Error", f"Error updating charts: {str(error)}")
+        
+    def apply_chart_style(self):
+        plt.style.use('seaborn-v0_8-darkgrid' if self.current_theme == 'dark' else 'seaborn-v0_8')
+
+        bg_color = self.colors['card_bg']
+        text_color = self.colors['text']
+
+        plt.rcParams.update({
+            'figure.facecolor': bg_color,
+            'axes.facecolor': bg_color,
+            'axes.edgecolor': text_color,
+            'axes.labelcolor': text_color,
+            'xtick.color': text_color,
+            'ytick.color': text_color,
+            'text.color': text_color,
+            'font.size': 8,
+            'axes.titlesize': 10,
+            'axes.labelsize': 8,
+            'xtick.labelsize': 7,
+            'ytick.labelsize': 7,
+            'legend.fontsize': 8,
+            'figure.titlesize': 10,
+            'figure.subplot.left': 0.15,
+            'figure.subplot.right': 0.95,
+            'figure.subplot.top': 0.9,
+            'figure.subplot.bottom': 0.2,
+            'figure.subplot.wspace': 0.3,
+            'figure.subplot.hspace': 0.6,
+            'figure.max_open_warning': 50  
+        })
+
+    def chart_layout(self):
+        # Per tab: (chart key, card title, icon, grid options, chart factory, snapshot data)
+        return {
+            'overview': [
+                ('product_distribution', "Product Distribution", "📊", {'row': 0, 'column': 0},
+                 self.create_product_distribution_chart, lambda s: s.product_distribution),
+                ('stock_value', "Stock Value by Category", "💰", {'row': 0, 'column': 1},
+                 self.create_stock_value_chart, lambda s: s.stock_value)
+            ],
+            'products': [
+                ('prices', "Price Distribution", "📈", {'row': 0, 'column': 0},
+                 self.create_price_distribution_chart, lambda s: s.histogram('price')),
+                ('top_products', "Top Products by Value", "🏆", {'row': 0, 'column': 1},
+                 self.create_top_products_chart, lambda s: s.top_products),
+                ('quantities', "Quantity Distribution", "📦", {'row': 1, 'column': 0, 'columnspan': 2},
+                 self.create_quantity_distribution_chart, lambda s: s.histogram('quantity'))
+            ],
+            'categories': [
+                ('category_distribution', "Products per Category", "🏷️", {'row': 0, 'column': 0},
+                 self.create_category_distribution_chart, lambda s: s.category_distribution),
+                ('avg_price', "Average Price by Category", "💲", {'row': 0, 'column': 1},
+                 self.create_avg_price_chart, lambda s: s.avg_price)
+            ],
+            'trends': [
+                ('low_stock', "Low Stock Items", "⚠️", {'row': 0, 'column': 0},
+                 self.create_low_stock_chart, lambda s: s.low_stock),
+                ('values', "Value Distribution", "📊", {'row': 0, 'column': 1},
+                 self.create_value_distribution_chart, lambda s: s.histogram('value'))
+            ]
+        }
 
-            # Final garbage collection
-            gc.collect()
+    def reset_charts(self):
+        # A theme change restyles every figure, so the charts are rebuilt from scratch once
+        for frame in self.charts_frames.values():
+            for widget in frame.winfo_children():
+                widget.destroy()
+        self.charts = {}
+        self.chart_cards = {}
+        self._charts_theme = self.current_theme
+        self.apply_chart_style()
+
+    def render_charts(self, tab, snapshot):
+        try:
+            profiling = os.getenv("PROFILE_CHARTS") == "1"
+            if profiling:
+                tracemalloc.start()
+            started = time.perf_counter()
+
+            if self._charts_theme != self.current_theme:
+                self.reset_charts()
+
+            for key, title, icon, grid, create_chart, data in self.chart_layout()[tab]:
+                chart = self.charts.get(key)
+                if chart is None or not self.chart_cards[key].winfo_exists():
+                    card, content = self.create_card(self.charts_frames[tab], title=title, icon=icon)
+                    card.grid(padx=15, pady=15, sticky="nsew", **grid)
+                    chart = create_chart(content)
+                    self.charts[key] = chart
+                    self.chart_cards[key] = content
+                # Moves the existing bars, wedges and bins, the canvas redraws once with draw_idle
+                chart.update(data(snapshot))
+
+            if profiling:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"Charts '{tab}' refreshed in {(time.perf_counter() - started) * 1000:.1f} ms, "
+                      f"peak allocations {peak / 1024:.0f} KiB")
 
         except Exception as e:
             print(f"Error in update_charts: {e}")
             messagebox.showerror("Error", f"Error updating charts: {str(e)}")
 
-    def create_product_distribution_chart(self, parent, colors):
-        try:
-            fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
-            cursor = self.conn.cursor()
-
-            cursor.execute("""
-                SELECT c.name, COUNT(p.id) 
-                FROM category c 
-                LEFT JOIN product p ON c.id = p.id_category 
-                GROUP BY c.name
-            """)
-            cat_data = cursor.fetchall()
-
-            if not cat_data:
-                ax.text(0.5, 0.5, 'No data available',
-                        ha='center', va='center',
-                        fontsize=12, color='gray')
-            else:
-                categories = [x[0] for x in cat_data]
-                counts = [x[1] for x in cat_data]
-
-                # Wrap long category names
-                wrapped_labels = ['\n'.join(wrap(label, 15)) for label in categories]
-
-                # Center the pie chart and give more space for labels
-                ax.set_position([0.1, 0.1, 0.8, 0.8])
-
-                wedges, texts, autotexts = ax.pie(
-                    counts, 
-                    labels=wrapped_labels,
-                    autopct='%1.0f%%', 
-                    colors=colors[:len(categories)], 
-                    wedgeprops={'width': 0.6},
-                    textprops={'fontsize': 8, 'ha': 'center', 'va': 'center'},
-                    pctdistance=0.85,
-                    radius=0.8,
-                    labeldistance=1.2
-                )
-
-                # Lable colors visible in both themes
-                plt.setp(autotexts, size=8, weight="bold", color="white")
-                plt.setp(texts, size=8, color=self.colors['text'])
-
-                # Add interactive features
-                def on_hover(event):
-                    for i, wedge in enumerate(wedges):
-                        if wedge.contains_point([event.x, event.y]):
-                            wedge.set_linewidth(2)
-                            wedge.set_edgecolor('black')
-                            tooltip = f"{categories[i]}: {counts[i]} products"
-                            ax.set_title(tooltip, fontsize=10)
-                        else:
-                            wedge.set_linewidth(0)
-                            wedge.set_edgecolor('none')
-                    fig.canvas.draw_idle()
-
-                fig.canvas.mpl_connect('motion_notify_event', on_hover)
-
-            plt.tight_layout(pad=2.0)
-
-            canvas = FigureCanvasTkAgg(fig, master=parent)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-
-            # Сlean garbage to preserve memory
-            plt.close(fig)
-            gc.collect()
-
-        except Exception as e:
-            print(f"Error in create_product_distribution_chart: {e}")
-            messagebox.showerror("Error", f"Error creating product distribution chart: {str(e)}")
-
-    def create_stock_value_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(7, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT c.name, SUM(p.price * p.quantity) 
-            FROM category c 
-            LEFT JOIN product p ON c.id = p.id_category 
-            GROUP BY c.name
-        """)
-        value_data = cursor.fetchall()
-        categories = [x[0] for x in value_data]
-        values = [x[1] if x[1] is not None else 0 for x in value_data]
-        
-        bars = ax.bar(categories, values, color=colors[:len(categories)])
-        ax.set_xlabel('Category', fontsize=10, labelpad=10)
-        ax.set_ylabel('Value ($)', fontsize=10, labelpad=10)
-        plt.setp(ax.get_xticklabels(), rotation=30, ha='right')
-        
-        def format_value(x, p):
-            if x >= 1e6:
-                return f'${x/1e6:.1f}M'
-            elif x >= 1e3:
-                return f'${x/1e3:.1f}K'
-            return f'${x:.0f}'
-        
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(format_value))
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    format_value(height, None),
-                    ha='center', va='bottom',
-                    fontsize=8, fontweight='bold')
-
-        # Create a text annotation for tooltip that will be updated
-        tooltip_text = ax.text(0.5, 0.7, '', transform=ax.transAxes, 
-                              ha='center', va='top', fontsize=10,
-                              bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.5))
-        tooltip_text.set_visible(False)
-
-        
-        def on_hover(event):
-            if event.inaxes == ax:
-                found = False
-                for i, bar in enumerate(bars):
-                    contains, _ = bar.contains(event)
-                    if contains:
-                        bar.set_edgecolor('black')
-                        bar.set_linewidth(2)
-                        tooltip = f"{categories[i]}: {format_value(values[i], None)}"
-                        tooltip_text.set_text(tooltip)
-                        tooltip_text.set_visible(True)
-                        found = True
-                    else:
-                        bar.set_edgecolor('none')
-                        bar.set_linewidth(0)
-                
-                if not found:
-                    tooltip_text.set_visible(False)
-                
-                fig.canvas.draw_idle()
-
-        # Connect the hover event
-        cid = fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-        
-
-        canvas.cid = cid
-
-    def create_price_distribution_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT price FROM product")
-        prices = [x[0] for x in cursor.fetchall()]
-        
-        n_bins = min(8, len(set(prices)))
-        n, bins, patches = ax.hist(prices, bins=n_bins, edgecolor='white')
-        
-        for i, patch in enumerate(patches):
-            patch.set_facecolor(colors[i % len(colors)])
-        
-        ax.set_xlabel('Price ($)', fontsize=10, labelpad=10)
-        ax.set_ylabel('Count', fontsize=10, labelpad=10)
-        
-        if max(prices) > 1000:
-            ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x/1000:.1f}K' if x >= 1000 else f'${x:.0f}'))
-        
-        # Create a text annotation for tooltip that will be updated
-        tooltip_text = ax.text(0.5, 0.95, '', transform=ax.transAxes, 
-                              ha='center', va='top', fontsize=10,
-                              bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.7))
-        tooltip_text.set_visible(False)
-        
-        # Add interactive features
-        def on_hover(event):
-            if event.inaxes == ax:
-                found = False
-                for i, patch in enumerate(patches):
-                    contains, _ = patch.contains(event)
-                    if contains:
-                        patch.set_edgecolor('black')
-                        patch.set_linewidth(2)
-                        tooltip = f"Price Range: ${bins[i]:.0f} - ${bins[i+1]:.0f}, Count: {int(n[i])}"
-                        tooltip_text.set_text(tooltip)
-                        tooltip_text.set_visible(True)
-                        found = True
-                    else:
-                        patch.set_edgecolor('white')
-                        patch.set_linewidth(1)
-                
-                if not found:
-                    tooltip_text.set_visible(False)
-                
-                fig.canvas.draw_idle()
-
-        # Connect the hover event
-        cid = fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-        
-        # Store the connection ID to prevent garbage collection
-        canvas.cid = cid
-
-    def create_top_products_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(8.5, 5), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT name, price * quantity as total_value 
-            FROM product 
-            ORDER BY total_value DESC 
-            LIMIT 5
-        """)
-        value_data = cursor.fetchall()
-        
-        products = [x[0] for x in value_data]
-        values = [x[1] for x in value_data]
-        
-        bars = ax.barh(products, values, color=colors[:len(products)])
-        
-        ax.set_xlabel('Value ($)', fontsize=10, labelpad=10)
-        
-        def format_value(x, p):
-            if x >= 1e6:
-                return f'${x/1e6:.1f}M'
-            elif x >= 1e3:
-                return f'${x/1e3:.1f}K'
-            return f'${x:.0f}'
-        
-        ax.xaxis.set_major_formatter(plt.FuncFormatter(format_value))
-        
-        plt.setp(ax.get_yticklabels(), fontsize=8)
-        ax.set_ylim(-0.5, len(products) - 0.5)  # Add more space between bars
-        
-        for i, bar in enumerate(bars):
-            width = bar.get_width()
-            ax.text(width, i, format_value(width, None),
-                    ha='left', va='center',
-                    fontsize=8, fontweight='bold')
-
-        # Add interactive features
-        def on_hover(event):
-            if event.inaxes == ax:
-                for i, bar in enumerate(bars):
-                    if bar.contains_point((event.x, event.y)):
-                        bar.set_edgecolor('black')
-                        tooltip = f"{products[i]}: ${values[i]:,.0f}"
-                        ax.set_title(tooltip, fontsize=10)
-                    else:
-                        bar.set_edgecolor('none')
-                fig.canvas.draw_idle()
-
-        fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-
-    def create_quantity_distribution_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(12, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT quantity FROM product")
-        quantities = [x[0] for x in cursor.fetchall()]
-        
-        n_bins = min(10, len(set(quantities)))
-        n, bins, patches = ax.hist(quantities, bins=n_bins, edgecolor='white')
-        
-        for i, patch in enumerate(patches):
-            patch.set_facecolor(colors[i % len(colors)])
-        
-        ax.set_xlabel('Quantity', fontsize=10, labelpad=10)
-        ax.set_ylabel('Number of Products', fontsize=10, labelpad=10)
-        
-    
-        def on_hover(event):
-            if event.inaxes == ax:
-                for i, patch in enumerate(patches):
-                    if patch.contains_point((event.x, event.y), radius=1):
-                        patch.set_edgecolor('black')
-                        tooltip = f"Quantity Range: {bins[i]:.0f} - {bins[i+1]:.0f}, Count: {int(n[i])}"
-                        ax.set_title(tooltip, fontsize=10)
-                    else:
-                        patch.set_edgecolor('white')
-                fig.canvas.draw_idle()
-
-        fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-
-    def create_category_distribution_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(7, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT c.name, COUNT(p.id) as product_count
-            FROM category c
-            LEFT JOIN product p ON c.id = p.id_category
-            GROUP BY c.name
-            ORDER BY product_count DESC
-        """)
-        data = cursor.fetchall()
-        
-        categories = [x[0] for x in data]
-        counts = [x[1] for x in data]
-        
-        bars = ax.bar(categories, counts, color=colors[:len(categories)])
-        ax.set_xlabel('Category', fontsize=10, labelpad=10)
-        ax.set_ylabel('Number of Products', fontsize=10, labelpad=10)
-        plt.setp(ax.get_xticklabels(), rotation=30, ha='right')
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height)}',
-                    ha='center', va='bottom',
-                    fontsize=8, fontweight='bold')
-
-        # Create a text annotation for tooltip that will be updated
-        tooltip_text = ax.text(0.5, 0.95, '', transform=ax.transAxes, 
-                              ha='center', va='top', fontsize=10,
-                              bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.7))
-        tooltip_text.set_visible(False)
-
-        # Add interactive features with improved hover detection
-        def on_hover(event):
-            if event.inaxes == ax:
-                found = False
-                for i, bar in enumerate(bars):
-                    contains, _ = bar.contains(event)
-                    if contains:
-                        bar.set_edgecolor('black')
-                        bar.set_linewidth(2)
-                        tooltip = f"{categories[i]}: {counts[i]} products"
-                        tooltip_text.set_text(tooltip)
-                        tooltip_text.set_visible(True)
-                        found = True
-                    else:
-                        bar.set_edgecolor('none')
-                        bar.set_linewidth(0)
-                
-                if not found:
-                    tooltip_text.set_visible(False)
-                
-                fig.canvas.draw_idle()
-
-        # Connect the hover event
-        cid = fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-        
-        # Store the connection ID to prevent garbage collection
-        canvas.cid = cid
-
-    def create_avg_price_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(7, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT c.name, AVG(p.price) as avg_price
-            FROM category c
-            LEFT JOIN product p ON c.id = p.id_category
-            GROUP BY c.name
-            ORDER BY avg_price DESC
-        """)
-        data = cursor.fetchall()
-        
-        categories = [x[0] for x in data]
-        avg_prices = [x[1] if x[1] is not None else 0 for x in data]
-        
-        bars = ax.bar(categories, avg_prices, color=colors[:len(categories)])
-        ax.set_xlabel('Category', fontsize=10, labelpad=10)
-        ax.set_ylabel('Average Price ($)', fontsize=10, labelpad=10)
-        plt.setp(ax.get_xticklabels(), rotation=30, ha='right')
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'${int(height)}',
-                    ha='center', va='bottom',
-                    fontsize=8, fontweight='bold')
-
-        tooltip_text = ax.text(0.5, 0.95, '', transform=ax.transAxes, 
-                              ha='center', va='top', fontsize=10,
-                              bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.7))
-        tooltip_text.set_visible(False)
-
-        def on_hover(event):
-            if event.inaxes == ax:
-                found = False
-                for i, bar in enumerate(bars):
-                    contains, _ = bar.contains(event)
-                    if contains:
-                        bar.set_edgecolor('black')
-                        bar.set_linewidth(2)
-                        tooltip = f"{categories[i]}: ${avg_prices[i]:.2f}"
-                        tooltip_text.set_text(tooltip)
-                        tooltip_text.set_visible(True)
-                        found = True
-                    else:
-                        bar.set_edgecolor('none')
-                        bar.set_linewidth(0)
-                
-                if not found:
-                    tooltip_text.set_visible(False)
-                
-                fig.canvas.draw_idle()
-
+    def create_product_distribution_chart(self, parent):
+        return PieChart(parent, self.chart_colors['category_colors'], self.colors['text'], figsize=(8, 4),
+                        tooltip_format=lambda name, count: f"{name}: {count} products")
+
+    def create_stock_value_chart(self, parent):
+        return BarChart(parent, self.chart_colors['bar_colors'], self.colors['text'], figsize=(7, 4),
+                        xlabel='Category', ylabel='Value ($)',
+                        value_format=format_money, axis_format=format_money,
+                        tooltip_format=lambda name, value: f"{name}: {format_money(value)}")
+
+    def create_price_distribution_chart(self, parent):
+        return HistogramChart(parent, self.chart_colors['hist_colors'], self.colors['text'], figsize=(6, 4),
+                              xlabel='Price ($)', ylabel='Count', tooltip_label='Price Range',
+                              money_axis=True)
+
+    def create_top_products_chart(self, parent):
+        return HorizontalBarChart(parent, self.chart_colors['top_products_colors'], self.colors['text'],
+                                  figsize=(8.5, 5), xlabel='Value ($)',
+                                  value_format=format_money, axis_format=format_money,
+                                  tooltip_format=lambda name, value: f"{name}: ${value:,.0f}")
+
+    def create_quantity_distribution_chart(self, parent):
+        return HistogramChart(parent, self.chart_colors['hist_colors'], self.colors['text'], figsize=(12, 4),
+                              xlabel='Quantity', ylabel='Number of Products', tooltip_label='Quantity Range')
+
+    def create_category_distribution_chart(self, parent):
+        return BarChart(parent, self.chart_colors['category_colors'], self.colors['text'], figsize=(7, 4),
+                        xlabel='Category', ylabel='Number of Products',
+                        value_format=lambda value: f'{int(value)}',
+                        tooltip_format=lambda name, count: f"{name}: {count} products")
+
+    def create_avg_price_chart(self, parent):
+        return BarChart(parent, self.chart_colors['bar_colors'], self.colors['text'], figsize=(7, 4),
+                        xlabel='Category', ylabel='Average Price ($)',
+                        value_format=lambda value: f'${int(value)}',
+                        tooltip_format=lambda name, price: f"{name}: ${price:.2f}")
+
+    def create_low_stock_chart(self, parent):
+        return HorizontalBarChart(parent, self.chart_colors['bar_colors'], self.colors['text'],
+                                  figsize=(7, 4), xlabel='Quantity',
+                                  value_format=lambda value: str(int(value)),
+                                  tooltip_format=lambda name, quantity: f"{name}: {quantity} units",
+                                  single_color=True, empty_message='No products with low stock')
+
+    def create_value_distribution_chart(self, parent):
+        return HistogramChart(parent, self.chart_colors['hist_colors'], self.colors['text'], figsize=(7, 4),
+                              xlabel='Total Value ($)', ylabel='Number of Products', tooltip_label='Value Range',
+                              money_axis=True)
+        
+    def build_search_index(self):
+        def build(task):
+            index = TrigramIndex()
+            with self.db.cursor() as cursor:
+                cursor.execute("""
+                    SELECT p.id, p.name, p.description, p.price, p.quantity, c.name 
+                    FROM product p 
+                    JOIN category c ON p.id_category = c.id
+                """)
+                while True:
+                    rows = cursor.fetchmany(10000)
+                    if not rows or task.cancelled:
+                        break
+                    for row in rows:
+                        index.add(row)
+            # Walking every structure is slow on a large catalog, keep it off the Tk thread
+            return index, index.memory_footprint()
+        
+        def ready(result):
+            index, footprint = result
+            # Replay changes made while the index was being built
+            for change in self._index_backlog:
+                change(index)
+            self._index_backlog = []
+            self.search_index = index
+            print(f"Search index ready: {len(index)} products, "
+                  f"~{footprint / (1024 * 1024):.1f} MB")
+        
+        self.executor.submit("search_index", build, on_success=ready)
     
-        cid = fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-        
-        canvas.cid = cid
-
-    def create_low_stock_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(7, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT name, quantity
-            FROM product
-            WHERE quantity < 10
-            ORDER BY quantity
-        """)
-        data = cursor.fetchall()
-        
-        products = [x[0] for x in data]
-        quantities = [x[1] for x in data]
-        
-        if not products:
-            ax.text(0.5, 0.5, 'No products with low stock',
-                    ha='center', va='center',
-                    fontsize=12, color='gray')
+    def apply_to_search_index(self, change):
+        if self.search_index is not None:
+            change(self.search_index)
         else:
-            bars = ax.barh(products, quantities, color=colors[0])
-            ax.set_xlabel('Quantity', fontsize=10, labelpad=10)
-            plt.setp(ax.get_yticklabels(), fontsize=8)
+            self._index_backlog.append(change)
+    
+    def index_product(self, row):
+        self.apply_to_search_index(lambda index: index.update(row))
+    
+    def unindex_product(self, product_id):
+        self.apply_to_search_index(lambda index: index.remove(product_id))
+    
+    def unindex_category(self, category_name):
+        self.apply_to_search_index(lambda index: index.remove_category(category_name))
+    
+    @staticmethod
+    def matches_filters(row, filters):
+        # Same rules as the SQL filters in filter_products (NULL never matches a range)
+        price, quantity, category = row[3], row[4], row[5]
+        if price is None or not filters["price_min"] <= price <= filters["price_max"]:
+            return False
+        if quantity is None or not filters["stock_min"] <= quantity <= filters["stock_max"]:
+            return False
+        if filters["categories"] and category not in filters["categories"]:
+            return False
+        return True
+    
+    def filter_products_locally(self):
+        # Short terms and filter-only searches scan the whole index: keep that off the Tk thread.
+        # Sharing the "products" key, a newer search or page load supersedes this one
+        index = self.search_index
+        term = self.search_var.get()
+        filters = dict(self.filter_state, categories=list(self.filter_state["categories"]))
+        
+        def search(task):
+            return [row for row in index.search(term) if self.matches_filters(row, filters)]
+        
+        def found(products):
+            self.set_loading(self.tree_frame, False)
+            self.display_products(products)
+            self.update_filtered_status(len(products), len(index))
+        
+        self.set_loading(self.tree_frame, True)
+        self.executor.submit("products", search, on_success=found, on_error=self.on_products_error)
+    
+    def on_search_changed(self, *args):
+        # Coalesce keystrokes: only the last term typed within the debounce window is searched
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(self.SEARCH_DEBOUNCE_MS, self.run_debounced_search)
+    
+    def run_debounced_search(self):
+        self._search_after_id = None
+        self.filter_products()
+    
+    def abort_running_search(self):
+        # A newer request replaces the running one: drop its result and stop it on the server
+        previous = self.executor.cancel("products")
+        if previous is not None and previous.connection_id is not None:
+            def kill():
+                # The search cannot release its connection while we hold the lock; if it
+                # already has, connection_id is None and there is nothing left to stop
+                with previous.lock:
+                    if previous.connection_id is None:
+                        return
+                    try:
+                        self.db.kill_query(previous.connection_id)
+                    except Exception as e:
+                        print(f"Error aborting search query: {e}")
             
-            for i, bar in enumerate(bars):
-                width = bar.get_width()
-                ax.text(width, i, str(int(width)),
-                        ha='left', va='center',
-                        fontsize=8, fontweight='bold')
-
-            # Create a text annotation for tooltip that will be updated
-            tooltip_text = ax.text(0.5, 1, '', transform=ax.transAxes, 
-                                  ha='center', va='top', fontsize=10,
-                                  bbox=dict(boxstyle='round,pad=0.5', facecolor='yellow', alpha=0.7))
-            tooltip_text.set_visible(False)
-
-            def on_hover(event):
-                if event.inaxes == ax:
-                    found = False
-                    for i, bar in enumerate(bars):
-                        contains, _ = bar.contains(event)
-                        if contains:
-                            bar.set_edgecolor('black')
-                            bar.set_linewidth(2)
-                            tooltip = f"{products[i]}: {quantities[i]} units"
-                            tooltip_text.set_text(tooltip)
-                            tooltip_text.set_visible(True)
-                            found = True
-                        else:
-                            bar.set_edgecolor('none')
-                            bar.set_linewidth(0)
-                    
-                    if not found:
-                        tooltip_text.set_visible(False)
-                    
-                    fig.canvas.draw_idle()
-
-            cid = fig.canvas.mpl_connect('motion_notify_event', on_hover)
-
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-        
-        # Store the connection ID to prevent garbage collection
-        if 'bars' in locals():
-            canvas.cid = cid
-
-    def create_value_distribution_chart(self, parent, colors):
-        fig, ax = plt.subplots(figsize=(7, 4), dpi=100)
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT price * quantity as value FROM product")
-        values = [x[0] for x in cursor.fetchall()]
-        
-        n_bins = min(8, len(set(values)))
-        n, bins, patches = ax.hist(values, bins=n_bins, edgecolor='white')
-        
-        for i, patch in enumerate(patches):
-            patch.set_facecolor(colors[i % len(colors)])
-        
-        ax.set_xlabel('Total Value ($)', fontsize=10, labelpad=10)
-        ax.set_ylabel('Number of Products', fontsize=10, labelpad=10)
-        
-        if max(values) > 1000:
-            ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x/1000:.1f}K' if x >= 1000 else f'${x:.0f}'))
-        
-        # Create a text annotation for tooltip that will be updated with the current value
-        tooltip_text = ax.text(0.5, 0.9, '', transform=ax.transAxes,
-                              ha='center', va='top', fontsize=10,
-                              bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.7))
-        
-        def on_hover(event):
-            if event.inaxes == ax:
-                for i, patch in enumerate(patches):
-                    if patch.contains_point((event.x, event.y), radius=1):
-                        patch.set_edgecolor('black')
-                        tooltip = f"Value Range: ${bins[i]:.0f} - ${bins[i+1]:.0f}, Count: {int(n[i])}"
-                        ax.set_title(tooltip_text, fontsize=10)
-                    else:
-                        patch.set_edgecolor('white')
-                fig.canvas.draw_idle()
-
-        fig.canvas.mpl_connect('motion_notify_event', on_hover)
-        
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
-        
+            self.executor.run_detached(kill)
+    
     def filter_products(self, *args):
         """Filter products based on search term and advanced filters"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        cursor = self.conn.cursor()
+        # Answer from the in-memory index once it is built, no database round trip
+        if self.search_index is not None:
+            self.abort_running_search()
+            if not self.search_var.get().strip() and not self.filter_state["is_active"]:
+                # Nothing to narrow down: the paged catalog view, in the chosen sort order
+                self.load_products()
+                self.update_filtered_status(len(self.search_index), len(self.search_index))
+            else:
+                self.filter_products_locally()
+            return
+        
+        # FULLTEXT search for whole words, LIKE fallback for short terms
+        search_join, search_where, params, relevance = product_search(self.search_var.get())
         
-        # Build SQL query with filters
-        query = """
-            SELECT p.id, p.name, p.description, p.price, p.quantity, c.name 
+        # Build SQL query with filters, only ids are fetched and rows are loaded as they scroll into view
+        query = f"""
+            SELECT p.id
             FROM product p 
             JOIN category c ON p.id_category = c.id
-            WHERE 1=1
+            {search_join}
+            WHERE 1=1 {search_where}
         """
         
-        params = []
-        
-        search_term = self.search_var.get().lower()
-        if search_term:
-            query += """ AND (
-                LOWER(p.name) LIKE %s OR 
-                LOWER(p.description) LIKE %s OR 
-                CAST(p.price AS CHAR) LIKE %s OR 
-                CAST(p.quantity AS CHAR) LIKE %s OR 
-                LOWER(c.name) LIKE %s
-            )"""
-            search_pattern = f"%{search_term}%"
-            params.extend([search_pattern, search_pattern, search_pattern, search_pattern, search_pattern])
-        
         # Apply price filters
         query += " AND p.price >= %s AND p.price <= %s"
         params.extend([self.filter_state["price_min"], self.filter_state["price_max"]])
@@ -1916,17 +1709,43 @@ class StockManager:
             query += f" AND c.name IN ({placeholders})"
             params.extend(self.filter_state["categories"])
         
+        # Best matches first
+        if relevance:
+            query += f" ORDER BY {relevance}"
 
-        cursor.execute(query, params)
-        products = cursor.fetchall()
+        def fetch_filtered(task):
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                # Expose the server thread id so a newer search can KILL QUERY this one
+                with task.lock:
+                    task.connection_id = conn.connection_id
+                try:
+                    cursor.execute(query, params)
+                    ids = [row[0] for row in cursor.fetchall()]
+                finally:
+                    # Waits for a KILL in flight, so it never reaches the connection's next user
+                    with task.lock:
+                        task.connection_id = None
+                    cursor.close()
+            
+            return ids, self.get_total_products()
         
-        # Display results 
-        for i, product in enumerate(products):
-            tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
-            self.tree.insert("", "end", values=product, tags=tags)
+        def display_filtered(result):
+            ids, total_count = result
+            self.set_loading(self.tree_frame, False)
+            
+            # Display results 
+            self.virtual_table.set_source(IdListRowSource(self.executor, self.db, self.PRODUCT_SELECT, ids))
+            
+            # Update status
+            self.update_filtered_status(len(ids), total_count)
         
-        # Update status
-        self.update_filtered_status(len(products), self.get_total_products())
+        # Shares the "products" key so a newer page load or search supersedes this one
+        self.abort_running_search()
+        self.set_loading(self.tree_frame, True)
+        self.executor.submit("products", fetch_filtered,
+                             on_success=display_filtered,
+                             on_error=self.on_products_error)
 
     def update_filtered_status(self, filtered_count, total_count):
     
@@ -1946,6 +1765,196 @@ class StockManager:
             )
             self.filter_status_label.pack(side="bottom", anchor="e", padx=10, pady=5)
 
+    def fetch_product_row(self, cursor, product_id, lock=False):
+        # Row as displayed in the table, read inside the write's own transaction
+        cursor.execute(f"{self.PRODUCT_SELECT} WHERE p.id = %s{' FOR UPDATE' if lock else ''}",
+                       (product_id,))
+        return cursor.fetchone()
+    
+    def product_exists(self, cursor, product_id):
+        # An UPDATE's rowcount only counts rows it changed: 0 is an unchanged save or a vanished product
+        cursor.execute("SELECT 1 FROM product WHERE id = %s", (product_id,))
+        return cursor.fetchone() is not None
+    
+    def on_product_deleted_elsewhere(self, product_id):
+        # Whether the change feed already applied the delete is unknown, so no delta: reload instead
+        messagebox.showwarning("Warning", "This product was deleted by another user meanwhile")
+        self.unindex_product(product_id)
+        self.invalidate_product_pages(count_changed=True)
+        self.load_products()
+        self.dashboard_snapshot = None
+        self.update_charts()
+    
+    def on_product_changed(self, change):
+        # Every product write ends here: the table, the search index and the dashboard follow the change
+        self.invalidate_product_pages(count_changed=change.count_changed)
+        self.update_search_index([change])
+        # Patch the current view (catalog, search or filter results) in place, like remote changes
+        if self.virtual_table.source.patch([change]):
+            self.virtual_table.refresh()
+        else:
+            self.load_products()
+        self.update_dashboard([change])
+    
+    def update_search_index(self, changes):
+        for change in changes:
+            if change.new is not None:
+                self.index_product(change.new)
+            else:
+                self.unindex_product(change.old[0])
+    
+    def update_dashboard(self, changes):
+        # Fold the changes into the current snapshot instead of querying every aggregate again
+        snapshot = self.dashboard_snapshot
+        if (snapshot is None or self.executor.is_pending("charts")
+                or not all(snapshot.apply(change) for change in changes)):
+            # A partly applied snapshot must not be drawn, the reload replaces it
+            self.dashboard_snapshot = None
+            self.update_charts()
+            return
+        self.render_dashboard(snapshot)
+    
+    def start_change_feed(self):
+        # Read before the first page, search index and dashboard load, so no write made
+        # while they load is missed; changes they already contain are applied again harmlessly
+        recent = [row[0] for row in self.db.fetchall(
+            "SELECT id FROM change_log ORDER BY id DESC LIMIT %s", (self.CHANGE_BATCH,))]
+        self._change_version = recent[0] if recent else 0
+        # Ids skipped by the feed -> when first seen. An id is skipped while its transaction
+        # has not committed yet (or for good after a rollback), so they are looked up again
+        # on every poll until GRACE_SECONDS have passed, like the delta export's window
+        now = time.monotonic()
+        self._change_gaps = {}
+        if recent:
+            logged = set(recent)
+            self._change_gaps = {entry_id: now for entry_id in range(recent[-1], recent[0])
+                                 if entry_id not in logged}
+        self.root.after(self.CHANGE_POLL_MS, self.poll_changes)
+    
+    def poll_changes(self):
+        since = self._change_version
+        gaps = sorted(self._change_gaps)
+        client_id = self.db.client_id
+        columns = """
+            SELECT id, table_name, row_id, action, client_id,
+                   old_name, old_price, old_quantity, old_category
+            FROM change_log
+        """
+        
+        def fetch(task):
+            with self.db.cursor() as cursor:
+                late = []
+                if gaps:
+                    placeholders = ', '.join(['%s'] * len(gaps))
+                    cursor.execute(f"{columns} WHERE id IN ({placeholders}) ORDER BY id", gaps)
+                    late = cursor.fetchall()
+                
+                cursor.execute(f"{columns} WHERE id > %s ORDER BY id LIMIT %s", (since, self.CHANGE_BATCH))
+                entries = cursor.fetchall()
+                version = entries[-1][0] if entries else since
+                seen = {entry[0] for entry in entries}
+                skipped = [entry_id for entry_id in range(since + 1, version) if entry_id not in seen]
+                entries = late + entries
+                if not entries:
+                    return since, [], {}, set(), skipped
+                
+                # Our own writes were already applied when they were made
+                product_ids = sorted({entry[2] for entry in entries
+                                      if entry[1] == 'product' and entry[4] != client_id})
+                rows = {}
+                if product_ids:
+                    placeholders = ', '.join(['%s'] * len(product_ids))
+                    cursor.execute(f"{self.PRODUCT_SELECT} WHERE p.id IN ({placeholders})", product_ids)
+                    rows = {row[0]: row for row in cursor.fetchall()}
+                return version, entries, rows, {entry[0] for entry in late}, skipped
+        
+        def fetched(result):
+            version, entries, rows, found, skipped = result
+            self._change_version = version
+            now = time.monotonic()
+            for entry_id in found:
+                self._change_gaps.pop(entry_id, None)
+            for entry_id in skipped:
+                self._change_gaps[entry_id] = now
+            for entry_id, first_seen in list(self._change_gaps.items()):
+                if now - first_seen > GRACE_SECONDS or len(self._change_gaps) > self.MAX_CHANGE_GAPS:
+                    del self._change_gaps[entry_id]
+            if entries:
+                late = any(entry[0] in found and entry[4] != client_id for entry in entries)
+                self.apply_remote_changes(entries, rows, late=late)
+            self.root.after(self.CHANGE_POLL_MS, self.poll_changes)
+        
+        def failed(error):
+            print(f"Error polling changes: {error}")
+            self.root.after(self.CHANGE_POLL_MS, self.poll_changes)
+        
+        self.executor.submit("changes", fetch, on_success=fetched, on_error=failed)
+    
+    def product_changes(self, entries, rows):
+        """Net ProductChange per product from change_log entries and the rows as they are now.
+        
+        The old row comes from the first entry for a product; its description
+        is not logged and stays None.
+        """
+        category_names = {category_id: name for name, category_id in self.category_ids().items()}
+        changes = {}
+        for _, table, row_id, action, _, name, price, quantity, category in entries:
+            if table != 'product' or row_id in changes:
+                continue
+            old, unknown = None, ()
+            if action != 'I':
+                old = (row_id, name, None, price, quantity, category_names.get(category))
+                # The description is not logged, nor is the name of a category deleted since
+                unknown = (2,) if old[5] is not None else (2, 5)
+            changes[row_id] = ProductChange(old, rows.get(row_id), unknown)
+        return [change for change in changes.values() if change.old is not None or change.new is not None]
+    
+    def apply_remote_changes(self, entries, rows, late=False):
+        # Other clients' writes: patch the changed rows and aggregates, nothing is reloaded wholesale.
+        # late is True when entries include ids that committed after higher ones were read
+        own = [entry for entry in entries if entry[4] == self.db.client_id]
+        entries = [entry for entry in entries if entry[4] != self.db.client_id]
+        if not entries:
+            return
+        
+        if any(entry[3] == 'R' for entry in entries):
+            # A bulk load logs one reload entry instead of its rows
+            self.refresh_after_bulk_load()
+            return
+        
+        if any(entry[1] == 'category' for entry in entries):
+            self.category_ids(reload=True)
+            self.sync_category_filter()
+        
+        changes = self.product_changes(entries, rows)
+        if changes:
+            count_changed = any(change.count_changed for change in changes)
+            self.invalidate_product_pages(count_changed=count_changed)
+            self.update_search_index(changes)
+            
+            if self.virtual_table.source.patch(changes):
+                self.virtual_table.refresh()
+            else:
+                self.load_products()
+        
+        snapshot = self.dashboard_snapshot
+        first_remote = {}
+        for entry in entries:
+            first_remote.setdefault((entry[1], entry[2]), entry[0])
+        # One of our writes landing between another client's and now was applied to
+        # a snapshot that did not have theirs yet, so the deltas no longer add up
+        interleaved = any(entry[0] > first_remote.get((entry[1], entry[2]), entry[0]) for entry in own)
+        # A late entry may sit below the snapshot's version without being counted in it
+        if interleaved or late or any(entry[1] == 'category' for entry in entries):
+            # Category lists and colors shift, read the dashboard again
+            self.dashboard_snapshot = None
+            self.update_charts()
+        elif snapshot is not None:
+            # Entries up to the snapshot's version are already counted in it
+            newer = self.product_changes([entry for entry in entries if entry[0] > snapshot.change_version], rows)
+            if newer:
+                self.update_dashboard(newer)
+    
     def add_product_window(self):
         window = ctk.CTkToplevel(self.root)
         window.title("Add Product")
@@ -1980,9 +1989,7 @@ class StockManager:
             text_color=self.colors['text']
         ).pack(fill="x", pady=(10, 0))
         
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM category")
-        categories = [x[0] for x in cursor.fetchall()]
+        categories = self.category_names()
         
         category_combo = self.create_themed_combobox(
             form_frame,
@@ -1994,25 +2001,27 @@ class StockManager:
         
         def save_product():
             try:
-                cursor = self.conn.cursor()
-                # Get category id
-                cursor.execute("SELECT id FROM category WHERE name = %s", (category_var.get(),))
-                category_id = cursor.fetchone()[0]
-                
                 # Validate inputs
                 if not all([name_var.get(), desc_var.get(), price_var.get(), quantity_var.get(), category_var.get()]):
                     messagebox.showwarning("Warning", "Please fill in all fields")
                     return
                 
-                cursor.execute("""
-                    INSERT INTO product (name, description, price, quantity, id_category)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (name_var.get(), desc_var.get(), int(price_var.get()), 
-                      int(quantity_var.get()), category_id))
+                category_id = self.category_id(category_var.get())
+                if category_id is None:
+                    messagebox.showerror("Error", f"Unknown category '{category_var.get()}'")
+                    return
                 
-                self.conn.commit()
-                self.load_products()
-                self.update_charts()
+                with self.db.cursor(commit=True) as cursor:
+                    cursor.execute("""
+                        INSERT INTO product (name, description, price, quantity, id_category)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, (name_var.get(), desc_var.get(), int(price_var.get()), 
+                          int(quantity_var.get()), category_id))
+                    # The row as the table would read it back, without another query
+                    new_row = (cursor.lastrowid, name_var.get(), desc_var.get(), int(price_var.get()),
+                               int(quantity_var.get()), category_var.get())
+                
+                self.on_product_changed(ProductChange(None, new_row))
                 window.destroy()
                 messagebox.showinfo("Success", "Product added successfully!")
                 
@@ -2053,6 +2062,8 @@ class StockManager:
             return
             
         values = self.tree.item(selected[0])['values']
+        # The row before the edit, as loaded for display
+        old_row = self.virtual_table.displayed_row(selected[0])
         
         window = ctk.CTkToplevel(self.root)
         window.title("Edit Product")
@@ -2081,9 +2092,7 @@ class StockManager:
             text_color=self.colors['text']
         ).pack(fill="x", pady=(10, 0))
         
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM category")
-        categories = [x[0] for x in cursor.fetchall()]
+        categories = self.category_names()
         
         category_combo = self.create_themed_combobox(
             form_frame,
@@ -2095,22 +2104,34 @@ class StockManager:
         
         def save_changes():
             try:
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT id FROM category WHERE name = %s", (category_var.get(),))
-                category_id = cursor.fetchone()[0]
+                category_id = self.category_id(category_var.get())
+                if category_id is None:
+                    messagebox.showerror("Error", f"Unknown category '{category_var.get()}'")
+                    return
                 
-                # Update product
-                cursor.execute("""
-                    UPDATE product 
-                    SET name = %s, description = %s, price = %s, quantity = %s, id_category = %s
-                    WHERE id = %s
-                """, (name_var.get(), desc_var.get(), int(price_var.get()), 
-                      int(quantity_var.get()), category_id, values[0]))
+                new_row = (values[0], name_var.get(), desc_var.get(), int(price_var.get()),
+                           int(quantity_var.get()), category_var.get())
+                with self.db.cursor(commit=True) as cursor:
+                    # Only read back when the row has left the screen since the window opened
+                    row = old_row
+                    if row is None:
+                        row = self.fetch_product_row(cursor, values[0], lock=True)
+                    
+                    # Update product
+                    cursor.execute("""
+                        UPDATE product 
+                        SET name = %s, description = %s, price = %s, quantity = %s, id_category = %s
+                        WHERE id = %s
+                    """, new_row[1:5] + (category_id, values[0]))
+                    changed = cursor.rowcount > 0
+                    deleted = row is None or (not changed and not self.product_exists(cursor, values[0]))
                 
-                self.conn.commit()
-                self.load_products()
-                self.update_charts()
                 window.destroy()
+                if deleted:
+                    self.on_product_deleted_elsewhere(values[0])
+                    return
+                if changed:
+                    self.on_product_changed(ProductChange(row, new_row))
                 messagebox.showinfo("Success", "Product updated successfully!")
                 
             except Exception as e:
@@ -2132,12 +2153,13 @@ class StockManager:
             
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this product?"):
             try:
-                cursor = self.conn.cursor()
                 product_id = self.tree.item(selected[0])['values'][0]
-                cursor.execute("DELETE FROM product WHERE id = %s", (product_id,))
-                self.conn.commit()
-                self.load_products()
-                self.update_charts()
+                with self.db.cursor(commit=True) as cursor:
+                    old_row = self.fetch_product_row(cursor, product_id, lock=True)
+                    cursor.execute("DELETE FROM product WHERE id = %s", (product_id,))
+                
+                if old_row is not None:
+                    self.on_product_changed(ProductChange(old_row, None))
                 messagebox.showinfo("Success", "Product deleted successfully!")
                 
             except Exception as e:
@@ -2165,22 +2187,32 @@ class StockManager:
         
         def save_category():
             try:
-                if not name_var.get().strip():
+                name = name_var.get().strip()
+                if not name:
                     messagebox.showwarning("Warning", "Please enter a category name")
                     return
                 
-                cursor = self.conn.cursor()
-
-                # Check if category already exists
-                cursor.execute("SELECT COUNT(*) FROM category WHERE name = %s", (name_var.get(),))
-                if cursor.fetchone()[0] > 0:
+                if name in self.category_ids():
                     messagebox.showwarning("Warning", "Category already exists")
                     return
-
-                cursor.execute("INSERT INTO category (name) VALUES (%s)", (name_var.get(),))
-                self.conn.commit()
-
-                self.update_category_combobox()
+                
+                with self.db.cursor(commit=True) as cursor:
+                    # uq_category_name rejects duplicates; LAST_INSERT_ID(id) returns the existing id instead
+                    cursor.execute("""
+                        INSERT INTO category (name) VALUES (%s)
+                        ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+                    """, (name,))
+                    inserted = cursor.rowcount == 1
+                    category_id = cursor.lastrowid
+                
+                if not inserted:
+                    # Added by another client, or differing only in case
+                    self.category_ids(reload=True)
+                    messagebox.showwarning("Warning", "Category already exists")
+                    return
+                
+                self.category_ids()[name] = category_id
+                self.sync_category_filter()
                 self.update_charts()
                 window.destroy()
                 messagebox.showinfo("Success", "Category added successfully!")
@@ -2198,9 +2230,7 @@ class StockManager:
         ).pack(pady=30)
 
     def delete_category(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM category")
-        categories = [x[0] for x in cursor.fetchall()]
+        categories = self.category_names()
         
         if not categories:
             messagebox.showwarning("Warning", "No categories available to delete")
@@ -2245,20 +2275,22 @@ class StockManager:
                 
             if messagebox.askyesno("Confirm", f"Are you sure you want to delete the category '{category_var.get()}'?\n\nThis will also delete all products in this category!"):
                 try:
-                    cursor = self.conn.cursor()
-
-                    # Delete all products in the category first
-                    cursor.execute("""
-                        DELETE p FROM product p 
-                        JOIN category c ON p.id_category = c.id
-                        WHERE c.name = %s
-                    """, (category_var.get(),))
+                    category_id = self.category_id(category_var.get())
+                    if category_id is None:
+                        messagebox.showerror("Error", f"Unknown category '{category_var.get()}'")
+                        return
+                    
+                    with self.db.cursor(commit=True) as cursor:
+                        # Delete all products in the category first
+                        cursor.execute("DELETE FROM product WHERE id_category = %s", (category_id,))
 
-                    # Then delete the category
-                    cursor.execute("DELETE FROM category WHERE name = %s", (category_var.get(),))
-                    self.conn.commit()
+                        # Then delete the category
+                        cursor.execute("DELETE FROM category WHERE id = %s", (category_id,))
+                    self.category_ids().pop(category_var.get(), None)
+                    self.invalidate_product_pages()
+                    self.unindex_category(category_var.get())
 
-                    self.update_category_combobox()
+                    self.sync_category_filter()
                     self.load_products()
                     self.update_charts()
                     window.destroy()
@@ -2277,32 +2309,26 @@ class StockManager:
         ).pack(pady=30)
 
     def export_data(self):
+        if self.job_executor.is_pending("export"):
+            # The button doubles as cancel while an export runs; the worker removes the partial file
+            self.job_executor.cancel("export")
+            self.export_btn.configure(text="Export Data")
+            return
+        
         try:
-            cursor = self.conn.cursor()
+            # Add search term filter if there are filters applied
+            search_term = self.search_var.get().lower()
+            search_join, search_where, params, relevance = product_search(search_term)
             
             # Start with base query
-            query = """
+            query = f"""
                     SELECT p.id, p.name, p.description, p.price, p.quantity, c.name as category
                     FROM product p 
                     JOIN category c ON p.id_category = c.id
-                WHERE 1=1
+                    {search_join}
+                WHERE 1=1 {search_where}
             """
             
-            params = []
-            
-            # Add search term filter if there are filters applied
-            search_term = self.search_var.get().lower()
-            if search_term:
-                query += """ AND (
-                    LOWER(p.name) LIKE %s OR 
-                    LOWER(p.description) LIKE %s OR 
-                    CAST(p.price AS CHAR) LIKE %s OR 
-                    CAST(p.quantity AS CHAR) LIKE %s OR 
-                    LOWER(c.name) LIKE %s
-                )"""
-                search_pattern = f"%{search_term}%"
-                params.extend([search_pattern, search_pattern, search_pattern, search_pattern, search_pattern])
-            
             # Apply filters
             if self.filter_state["is_active"]:
                 query += " AND p.price >= %s AND p.price <= %s"
@@ -2319,43 +2345,27 @@ class StockManager:
                     params.extend(self.filter_state["categories"])
             
             # Apply current sorting
-            column_map = {
-                "ID": "p.id",
-                "Name": "p.name",
-                "Description": "p.description",
-                "Price": "p.price",
-                "Quantity": "p.quantity",
-                "Category": "c.name"
-            }
-            
+            order_by = ""
             if hasattr(self, 'sort_column') and self.sort_column:
-                query += f" ORDER BY {column_map[self.sort_column]}"
+                order_by = f" ORDER BY {self.SORT_COLUMNS[self.sort_column][0]}"
                 if hasattr(self, 'sort_reverse') and self.sort_reverse:
-                    query += " DESC"
+                    order_by += " DESC"
             
     
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            # Create DataFrame with the filtered data
-            columns = ['ID', 'Name', 'Description', 'Price', 'Quantity', 'Category']
-            df = pd.DataFrame(data, columns=columns)
-            
-            # Create data-csv directory if it doesn't exist
-            export_dir = os.path.join("data-csv")
-            if not os.path.exists(export_dir):
-                os.makedirs(export_dir)
-            
             # Generate filename with timestamp and filter indication in the file's title
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filter_indicator = "_filtered" if (self.filter_state["is_active"] or search_term) else ""
-            filename = f"products{filter_indicator}_{timestamp}.csv"
+            export_format = self.EXPORT_FORMAT_LABELS[self.export_format_var.get()]
+            export_dir = os.path.join("data-csv")
+            if export_format == "delta":
+                # One directory per search/filter combination, holding its base, deltas and manifest
+                profile = profile_name(search_term, self.filter_state if self.filter_state["is_active"] else None)
+                filename = os.path.join("deltas", profile)
+            else:
+                filename = f"products{filter_indicator}_{timestamp}{EXPORT_FORMATS[export_format]}"
             full_path = os.path.join(export_dir, filename)
             
-            # Export to CSV
-            df.to_csv(full_path, index=False)
-            
-            # Show success message 
+            # Success message 
             if self.filter_state["is_active"] or search_term:
                 filter_desc = []
                 if search_term:
@@ -2372,18 +2382,189 @@ class StockManager:
             else:
                 message = f"All data exported successfully to {filename}"
             
-            messagebox.showinfo("Success", message)
+            # Stored in the schema metadata of columnar exports
+            metadata = {
+                "exported_at": datetime.now().isoformat(timespec="seconds"),
+                "search": search_term,
+                "filters": dict(self.filter_state) if self.filter_state["is_active"] else None,
+                "sort": getattr(self, 'sort_column', None),
+                "descending": bool(getattr(self, 'sort_reverse', False)),
+            }
+            
+            # Row total for the progress display, known without a query when nothing is filtered
+            total = None if filter_indicator or export_format == "delta" else self.cached_product_count()
+            progress = {"rows": 0}
+            
+            def write_export(task):
+                # Create data-csv directory if it doesn't exist
+                os.makedirs(export_dir, exist_ok=True)
+                
+                # Rows stream from the server straight to disk, batch by batch
+                def report(rows):
+                    progress["rows"] = rows
+                if export_format == "delta":
+                    return export_delta(self.db, query, params, order_by, full_path, profile=metadata,
+                                        progress=report, cancelled=lambda: task.cancelled)
+                return export_products(self.db, query + order_by, params, full_path, fmt=export_format,
+                                       metadata=metadata, progress=report,
+                                       cancelled=lambda: task.cancelled)
+            
+            def show_progress():
+                if self.job_executor.is_pending("export"):
+                    done = (f"{progress['rows'] / total:.0%}" if total
+                            else f"{progress['rows']:,} rows")
+                    self.export_btn.configure(text=f"Cancel Export ({done})")
+                    self.root.after(200, show_progress)
+            
+            def on_exported(result):
+                self.export_btn.configure(text="Export Data")
+                if export_format == "delta":
+                    if result["kind"] == "base":
+                        detail = f"New base snapshot with {result['rows']:,} products"
+                    else:
+                        detail = f"Delta with {result['upserts']:,} changed and {result['deletes']:,} deleted products"
+                    messagebox.showinfo("Success", f"{message}\n{detail}")
+                    return
+                messagebox.showinfo("Success", message)
+            
+            def on_export_error(error):
+                self.export_btn.configure(text="Export Data")
+                messagebox.showerror("Error", f"Error exporting data: {str(error)}")
+                print(f"Export error details: {error}")
+            
+            self.job_executor.submit("export", write_export,
+                                 on_success=on_exported,
+                                 on_error=on_export_error)
+            show_progress()
             
         except Exception as e:
             messagebox.showerror("Error", f"Error exporting data: {str(e)}")
             print(f"Export error details: {e}")
             
-    def update_category_combobox(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM category")
-        categories = ["All"] + [x[0] for x in cursor.fetchall()]
-        self.category_combobox.configure(values=categories)
-        self.category_combobox.set("All")
+    def ask_import_file(self, title):
+        return filedialog.askopenfilename(
+            title=title,
+            initialdir="data-csv" if os.path.isdir("data-csv") else ".",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+    
+    def set_importing(self, button=None, text=None):
+        # Both import modes share the "import" task key, so only one may run at a time
+        for btn, label in ((self.import_btn, "Import Data"), (self.sync_btn, "Sync Import")):
+            if button is None:
+                btn.configure(state="normal", text=label)
+            else:
+                btn.configure(state="disabled", text=text if btn is button else label)
+    
+    def import_data(self):
+        path = self.ask_import_file("Import products")
+        if not path:
+            return
+        
+        # Written by the worker thread, read by the progress loop on the Tk thread
+        progress = {"rows": 0, "fraction": 0.0}
+        
+        def run_import(task):
+            def report(rows, fraction):
+                progress["rows"], progress["fraction"] = rows, fraction
+            return import_products(self.db, path, client_id=self.db.client_id,
+                                   progress=report, cancelled=lambda: task.cancelled)
+        
+        def show_progress():
+            if self.job_executor.is_pending("import"):
+                self.import_btn.configure(text=f"Importing... {progress['fraction']:.0%} ({progress['rows']:,} rows)")
+                self.root.after(200, show_progress)
+        
+        def on_imported(result):
+            self.set_importing()
+            self.refresh_after_bulk_load()
+            messagebox.showinfo("Success", f"Imported {result['rows']:,} products from {os.path.basename(path)}"
+                                           f" ({result['categories']} new categories)")
+        
+        def on_import_error(error):
+            self.set_importing()
+            # Chunks committed before the error stay imported
+            self.refresh_after_bulk_load()
+            messagebox.showerror("Error", f"Error importing data: {str(error)}")
+            print(f"Import error details: {error}")
+        
+        self.set_importing(self.import_btn, "Importing...")
+        self.job_executor.submit("import", run_import, on_success=on_imported, on_error=on_import_error)
+        show_progress()
+    
+    def sync_import(self):
+        # Dry run first: compare the snapshot with the table, then apply only the differences once confirmed
+        path = self.ask_import_file("Sync products with a snapshot")
+        if not path:
+            return
+        
+        progress = {"text": "Comparing...", "applying": False}
+        
+        def show_progress():
+            if self.job_executor.is_pending("import"):
+                self.sync_btn.configure(text=progress["text"])
+                self.root.after(200, show_progress)
+        
+        def compare(task):
+            def report(fraction):
+                progress["text"] = f"Comparing... {fraction:.0%}"
+            return plan_sync(self.db, path, progress=report, cancelled=lambda: task.cancelled)
+        
+        def apply(plan):
+            def run_apply(task):
+                def report(done, total):
+                    progress["text"] = f"Syncing... {done:,}/{total:,}"
+                return apply_sync(self.db, plan, client_id=self.db.client_id,
+                                  progress=report, cancelled=lambda: task.cancelled)
+            
+            def on_applied(written):
+                self.set_importing()
+                self.refresh_after_bulk_load()
+                messagebox.showinfo("Success", f"Synchronized with {os.path.basename(path)}: {written:,} rows written")
+            
+            self.set_importing(self.sync_btn, "Syncing...")
+            progress["text"], progress["applying"] = "Syncing...", True
+            self.job_executor.submit("import", run_apply, on_success=on_applied, on_error=on_sync_error)
+            show_progress()
+        
+        def on_planned(plan):
+            self.set_importing()
+            if plan is None:
+                return
+            if not plan.changes:
+                messagebox.showinfo("Sync Import", f"Nothing to do: {plan.summary()}")
+                return
+            if messagebox.askyesno("Sync Import", f"{os.path.basename(path)}:\n{plan.summary()}\n\nApply these changes?"):
+                apply(plan)
+        
+        def on_sync_error(error):
+            self.set_importing()
+            if progress["applying"]:
+                # Batches committed before the error stay applied
+                self.refresh_after_bulk_load()
+            messagebox.showerror("Error", f"Error synchronizing data: {str(error)}")
+            print(f"Sync error details: {error}")
+        
+        self.set_importing(self.sync_btn, "Comparing...")
+        self.job_executor.submit("import", compare, on_success=on_planned, on_error=on_sync_error)
+        show_progress()
+    
+    def refresh_after_bulk_load(self):
+        # Too many rows changed to patch: reload the categories, the table, the search index and the dashboard
+        self.invalidate_product_pages()
+        self.category_ids(reload=True)
+        self.sync_category_filter()
+        self.load_products()
+        self.search_index = None
+        self.build_search_index()
+        self.dashboard_snapshot = None
+        self.update_charts()
+    
+    def sync_category_filter(self):
+        # Category lists are read from category_ids() whenever a window opens;
+        # only the active filter can still name a deleted category
+        known = self.category_ids()
+        self.filter_state["categories"] = [name for name in self.filter_state["categories"] if name in known]
 
     def create_card(self, parent, title=None, icon=None, width=None, height=None):
         """
@@ -2451,7 +2632,12 @@ class StockManager:
         return outer_frame, content_frame
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.executor.shutdown()
+            self.job_executor.shutdown()
+            self.report_pool_stats()
 
     def init_filter_state(self):
         # Initiliaze filter state 
@@ -2568,9 +2754,7 @@ class StockManager:
         ).pack(anchor="w", pady=(0, 5))
         
         # Get all categories
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM category")
-        categories = [cat[0] for cat in cursor.fetchall()]
+        categories = self.category_names()
         
         # Category checkboxes
         category_vars = {}
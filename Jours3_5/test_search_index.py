@@ -0,0 +1,41 @@
+import unittest
+
+from search_index import TrigramIndex
+
+
+ROWS = [
+    (1, "Stylo", "Stylo bille bleu", 2, 150, "Papeterie"),
+    (2, "Cahier", None, 4, 80, "Papeterie"),
+    (3, "Clavier USB", "Clavier filaire", 25, 12, "Informatique"),
+]
+
+
+class TrigramIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        for row in ROWS:
+            self.index.add(row)
+
+    def ids(self, term):
+        return [row[0] for row in self.index.search(term)]
+
+    def test_short_terms_match_inside_words(self):
+        self.assertEqual(self.ids("o"), [1, 3])
+        self.assertEqual(self.ids("yl"), [1])
+        # "Papeterie" is the category of the first two
+        self.assertEqual(self.ids("ie"), [1, 2, 3])
+
+    def test_short_terms_match_numbers_as_substrings(self):
+        self.assertEqual(self.ids("15"), [1])
+
+    def test_long_terms_are_ranked(self):
+        self.assertEqual(self.ids("clavier")[0], 3)
+        self.assertEqual(self.ids("clavire")[0], 3)
+
+    def test_removed_rows_are_not_found(self):
+        self.index.remove(1)
+        self.assertEqual(self.ids("o"), [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,513 @@
+from collections import OrderedDict
+
+from database import keyset_condition
+
+
+def split_changes(changes):
+    """(new rows by id, removed ids, added ids) of a list of ProductChange."""
+    rows_by_id = {change.product_id: change.new for change in changes if change.new is not None}
+    removed_ids = {change.product_id for change in changes if change.new is None}
+    added_ids = {change.product_id for change in changes if change.old is None}
+    return rows_by_id, removed_ids, added_ids
+
+
+class ListRowSource:
+    """Rows that are already in memory, e.g. results of the in-memory search index."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.count = len(rows)
+        self.on_loaded = None
+
+    def rows(self, start, stop):
+        return self._rows[start:stop]
+
+    def patch(self, changes):
+        # Rows added elsewhere are not part of these results
+        rows_by_id, removed_ids, _ = split_changes(changes)
+        self._rows = [rows_by_id.get(row[0], row) for row in self._rows if row[0] not in removed_ids]
+        self.count = len(self._rows)
+        return True
+
+    def close(self):
+        pass
+
+
+class BlockRowSource:
+    """Rows fetched from the database in fixed-size blocks on a background thread.
+
+    Only a bounded number of blocks is cached. rows() returns None for rows
+    whose block is not loaded yet and requests that block; on_loaded is
+    called on the Tk thread once it arrives so the view can redraw.
+    """
+
+    def __init__(self, executor, db, block_size=200, max_blocks=20):
+        self.executor = executor
+        self.db = db
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.count = None
+        self.on_loaded = None
+        self.on_count = None
+        self._blocks = OrderedDict()
+        self._pending = set()
+        self._closed = False
+
+    def _task_key(self, block):
+        return f"rows:{id(self)}:{block}"
+
+    def rows(self, start, stop):
+        if self.count is not None:
+            stop = min(stop, self.count)
+        first_block = start // self.block_size
+        last_block = max(first_block, (stop - 1) // self.block_size)
+        needed = range(first_block, last_block + 1)
+
+        # Blocks scrolled past are no longer worth fetching
+        for block in list(self._pending):
+            if block not in needed:
+                self.executor.cancel(self._task_key(block))
+                self._pending.discard(block)
+
+        result = []
+        for index in range(start, stop):
+            block = index // self.block_size
+            rows = self._blocks.get(block)
+            if rows is None:
+                self._request(block)
+                result.append(None)
+            else:
+                self._blocks.move_to_end(block)
+                offset = index - block * self.block_size
+                if offset >= len(rows):
+                    break
+                result.append(rows[offset])
+        return result
+
+    def _request(self, block):
+        if block in self._pending or self._closed:
+            return
+        self._pending.add(block)
+
+        def fetch(task):
+            with self.db.cursor() as cursor:
+                return self.load_block(cursor, block)
+
+        def loaded(result):
+            rows, count = result
+            self._pending.discard(block)
+            if self._closed:
+                return
+            if count is not None:
+                self.count = count
+                if self.on_count:
+                    self.on_count(count)
+            self._blocks[block] = rows
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+            if self.on_loaded:
+                self.on_loaded()
+
+        def failed(error):
+            self._pending.discard(block)
+            print(f"Error loading rows {block * self.block_size}+: {error}")
+
+        self.executor.submit(self._task_key(block), fetch, on_success=loaded, on_error=failed)
+
+    def load_block(self, cursor, block):
+        """Runs on a worker thread and returns (rows of the block, total count or None)."""
+        raise NotImplementedError
+
+    def patch(self, changes):
+        """Replace the rows of a list of ProductChange in the loaded blocks.
+
+        Returns False when the changes move rows between blocks and the
+        source has to be reloaded instead.
+        """
+        rows_by_id, _, _ = split_changes(changes)
+        for block, rows in self._blocks.items():
+            self._blocks[block] = [rows_by_id.get(row[0], row) for row in rows]
+        return True
+
+    def _discard_blocks(self):
+        for block in list(self._pending):
+            self.executor.cancel(self._task_key(block))
+        self._pending.clear()
+        self._blocks.clear()
+
+    def close(self):
+        self._closed = True
+        self._discard_blocks()
+
+
+class KeysetRowSource(BlockRowSource):
+    """The whole catalog in table order, read block by block with keyset seeks.
+
+    Each block starts at an anchor, the (sort value, p.id) of its first row,
+    so reading a block never scans the rows before it. Blocks whose anchor
+    is unknown are located with a key-only seek from the nearest known one.
+    """
+
+    def __init__(self, executor, db, select_sql, column, key_index, descending,
+                 count=None, on_count=None, **kwargs):
+        super().__init__(executor, db, **kwargs)
+        self.select_sql = select_sql
+        self.column = column
+        self.key_index = key_index
+        self.descending = descending
+        self.count = count
+        self.on_count = on_count
+        self.anchors = {0: None}
+
+        direction = "DESC" if descending else "ASC"
+        self.order_by = f"ORDER BY {column} {direction}"
+        if column != "p.id":
+            self.order_by += f", p.id {direction}"
+
+    def rows(self, start, stop):
+        if self.count is None:
+            # The first block also fetches the total row count
+            self._request(0)
+            return [None] * (stop - start)
+        return super().rows(start, stop)
+
+    def load_block(self, cursor, block):
+        count = None
+        if block == 0 and self.count is None:
+            cursor.execute("SELECT COUNT(*) FROM product")
+            count = cursor.fetchone()[0]
+
+        anchor = self.seek_anchor(cursor, block)
+        if block and anchor is None:
+            return [], count
+
+        where, params = "", []
+        if anchor:
+            condition, params = keyset_condition(self.column, anchor[0], anchor[1],
+                                                 self.descending, inclusive=True)
+            where = f"WHERE {condition}"
+
+        # One extra row gives the anchor of the next block for free
+        cursor.execute(f"""
+            {self.select_sql}
+            {where}
+            {self.order_by}
+            LIMIT %s
+        """, params + [self.block_size + 1])
+        rows = cursor.fetchall()
+
+        self.anchors[block] = anchor
+        if len(rows) > self.block_size:
+            next_row = rows[self.block_size]
+            self.anchors[block + 1] = (next_row[self.key_index], next_row[0])
+        return rows[:self.block_size], count
+
+    def patch(self, changes):
+        # Rows appearing, disappearing or changing sort key shift every following block,
+        # loaded or not: a row moving into the loaded range from elsewhere must show up too
+        key = self.key_index
+        for change in changes:
+            if change.old is None or change.new is None:
+                return False
+            if key in change.unknown or change.old[key] != change.new[key]:
+                return False
+        return super().patch(changes)
+
+    def seek_anchor(self, cursor, block):
+        """Return the sort key of the first row of a block, seeking from the closest known block."""
+        if block in self.anchors:
+            return self.anchors[block]
+
+        column = self.column
+        direction = "DESC" if self.descending else "ASC"
+        reverse = "ASC" if self.descending else "DESC"
+
+        following = self.anchors.get(block + 1)
+        if following is not None:
+            # Walk backwards from the first row of the following block
+            condition, params = keyset_condition(column, following[0], following[1], not self.descending)
+            order_by = f"ORDER BY {column} {reverse}, p.id {reverse}"
+            offset = self.block_size - 1
+        else:
+            # Other blocks may be adding anchors concurrently, iterate over a snapshot
+            known = max(b for b in list(self.anchors) if b < block)
+            start = self.anchors[known]
+            condition, params = "1=1", []
+            if start is not None:
+                condition, params = keyset_condition(column, start[0], start[1],
+                                                     self.descending, inclusive=True)
+            order_by = f"ORDER BY {column} {direction}, p.id {direction}"
+            offset = (block - known) * self.block_size
+
+        cursor.execute(f"""
+            SELECT {column}, p.id
+            FROM product p
+            JOIN category c ON p.id_category = c.id
+            WHERE {condition}
+            {order_by}
+            LIMIT 1 OFFSET %s
+        """, params + [offset])
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+
+
+class IdListRowSource(BlockRowSource):
+    """Search results held as an ordered list of product ids, rows loaded per block."""
+
+    def __init__(self, executor, db, select_sql, ids, **kwargs):
+        super().__init__(executor, db, **kwargs)
+        self.select_sql = select_sql
+        self.ids = ids
+        self.count = len(ids)
+
+    def load_block(self, cursor, block):
+        ids = self.ids[block * self.block_size:(block + 1) * self.block_size]
+        if not ids:
+            return [], None
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"{self.select_sql} WHERE p.id IN ({placeholders})", ids)
+        by_id = {row[0]: row for row in cursor.fetchall()}
+        return [by_id[product_id] for product_id in ids if product_id in by_id], None
+
+    def patch(self, changes):
+        _, removed_ids, _ = split_changes(changes)
+        if any(product_id in removed_ids for product_id in self.ids):
+            # Removing ids shifts the block boundaries, reload the visible blocks
+            self.ids = [product_id for product_id in self.ids if product_id not in removed_ids]
+            self.count = len(self.ids)
+            self._discard_blocks()
+            return True
+        return super().patch(changes)
+
+
+class RowHover:
+    """Highlights the Treeview row under the pointer with the 'hover' tag.
+
+    Motion events are coalesced to one lookup per frame and the tree is only
+    touched when the hovered row changes. The row's own tags (striping,
+    placeholder) are saved and put back when the pointer leaves it.
+    """
+
+    interval_ms = 16
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.current = None
+        self._saved_tags = ()
+        self._y = None
+        self._scheduled = False
+        tree.bind("<Motion>", self._on_motion, add="+")
+        tree.bind("<Leave>", self._on_leave, add="+")
+
+    def _on_motion(self, event):
+        self._y = event.y
+        self._schedule()
+
+    def _on_leave(self, event):
+        self._y = None
+        self._schedule()
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            self.tree.after(self.interval_ms, self._apply)
+
+    def _apply(self):
+        self._scheduled = False
+        iid = self.tree.identify_row(self._y) if self._y is not None else ""
+        if not iid or 'placeholder' in self.tree.item(iid, "tags"):
+            iid = None
+        if iid == self.current:
+            return
+        self._restore()
+        self.current = iid
+        if iid is not None:
+            self._saved_tags = self.tree.item(iid, "tags")
+            self.tree.item(iid, tags=('hover',))
+
+    def _restore(self):
+        # Leave the row alone if a redraw has rewritten its tags since it was highlighted
+        if self.current is not None and self._is_highlighted(self.current):
+            self.tree.item(self.current, tags=self._saved_tags)
+        self.current = None
+
+    def _is_highlighted(self, iid):
+        return self.tree.exists(iid) and tuple(self.tree.item(iid, "tags")) == ('hover',)
+
+    def refresh(self):
+        # Called after the rows were redrawn: a different row may now be under the pointer
+        if self.current is not None and not self._is_highlighted(self.current):
+            self.current = None
+        self._apply()
+
+
+class VirtualTreeview:
+    """Keeps only the visible window of a row source inside a ttk.Treeview.
+
+    The widget never holds more items than fit on screen; scrolling moves
+    the window over the source and redraws it, so a million-row result
+    costs the same to display as a ten-row one.
+    """
+
+    def __init__(self, tree, scrollbar, row_height, heading_height=30, on_render=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_height = row_height
+        self.heading_height = heading_height
+        self.on_render = on_render
+        self.source = None
+        self.first = 0
+        self.visible = 10
+        self.selected_id = None
+        # iid -> (values, tags) as last written to the tree
+        self._rendered = {}
+        self._keep_stale = False
+        self.hover = RowHover(tree)
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", self._on_resize, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        tree.bind("<Button-5>", lambda e: self._scroll_units(3))
+
+    @property
+    def count(self):
+        if self.source is None or self.source.count is None:
+            return 0
+        return self.source.count
+
+    def set_source(self, source, keep_position=False):
+        if self.source is not None and self.source is not source:
+            self.source.close()
+        self.source = source
+        source.on_loaded = lambda: self._on_source_loaded(source)
+        if not keep_position:
+            self.first = 0
+        # A reload of the same view keeps showing the old rows until fresh ones arrive
+        self._keep_stale = keep_position
+        self.refresh()
+
+    def _on_source_loaded(self, source):
+        # Ignore late blocks of a source that was replaced meanwhile
+        if source is self.source:
+            self.refresh()
+
+    def scroll_to(self, index):
+        last_start = max(0, self.count - self.visible)
+        self.first = max(0, min(index, last_start))
+        self.refresh()
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"|"pages")
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible
+            self._scroll_units(step)
+
+    def _scroll_units(self, step):
+        self.scroll_to(self.first + step)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        step = -1 if event.delta > 0 else 1
+        if abs(event.delta) >= 120:
+            step *= abs(event.delta) // 120
+        return self._scroll_units(step * 3)
+
+    def _on_resize(self, event):
+        visible = max(1, (event.height - self.heading_height) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            values = self.tree.item(selection[0], "values")
+            if values and 'placeholder' not in self.tree.item(selection[0], "tags"):
+                self.selected_id = values[0]
+
+    def displayed_row(self, iid):
+        """The row shown as item iid, as its source returned it, or None when not on screen."""
+        if iid.startswith("placeholder:"):
+            return None
+        rendered = self._rendered.get(iid)
+        return rendered[0] if rendered is not None else None
+
+    def refresh(self):
+        if self.source is None:
+            return
+        rows = self.source.rows(self.first, self.first + self.visible)
+        if self._keep_stale and rows and all(row is None for row in rows):
+            return
+        self._keep_stale = False
+        self.render(rows)
+        self._update_scrollbar()
+        if self.on_render:
+            self.on_render(self.first, self.count)
+
+    def render(self, rows):
+        columns = len(self.tree["columns"])
+        wanted = []
+        for offset, row in enumerate(rows):
+            index = self.first + offset
+            tags = ('evenrow',) if index % 2 == 0 else ('oddrow',)
+            if row is None:
+                wanted.append((f"placeholder:{index}", ("", "Loading...") + ("",) * (columns - 2),
+                               tags + ('placeholder',)))
+            else:
+                wanted.append((str(row[0]), tuple(row), tags))
+        self.reconcile(wanted)
+        self.hover.refresh()
+
+        if self.selected_id is not None:
+            iid = str(self.selected_id)
+            if self.tree.exists(iid) and iid not in self.tree.selection():
+                self.tree.selection_set(iid)
+
+    def reconcile(self, wanted):
+        """Make the tree show `wanted`, a list of (iid, values, tags), touching only what changed.
+
+        Rows are keyed by product id, so a row that stays on screen keeps its
+        item (and with it the selection) and is only moved, re-valued or
+        re-tagged when that part actually differs.
+        """
+        keep = {iid for iid, _, _ in wanted}
+        stale = [iid for iid in self.tree.get_children() if iid not in keep]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                self._rendered.pop(iid, None)
+
+        children = list(self.tree.get_children())
+        for position, (iid, values, tags) in enumerate(wanted):
+            if not self.tree.exists(iid):
+                self.tree.insert("", position, iid=iid, values=values, tags=tags)
+                children.insert(position, iid)
+            else:
+                previous_values, previous_tags = self._rendered.get(iid, (None, None))
+                if values != previous_values:
+                    self.tree.item(iid, values=values)
+                if tags != previous_tags:
+                    self.tree.item(iid, tags=tags)
+                if children[position] != iid:
+                    self.tree.move(iid, "", position)
+                    children.remove(iid)
+                    children.insert(position, iid)
+            self._rendered[iid] = (values, tags)
+
+    def _update_scrollbar(self):
+        if self.count <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        top = self.first / self.count
+        bottom = min(1.0, (self.first + self.visible) / self.count)
+        self.scrollbar.set(top, bottom)